@@ -1,20 +1,28 @@
 import streamlit as st
 import pandas as pd
 import re
-import subprocess
 import os
+import sys
+import tempfile
 from datetime import datetime
+import streamlit.components.v1 as components
 from streamlit_ace import st_ace
-from pymongo import MongoClient
-import time
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
 
-# MongoDB connection setup
-client = MongoClient('mongodb://localhost:27017/')  # Replace with your MongoDB URI
-db = client['DSA_code_app_db']  # Database name
-collection = db['submissions']  # Collection name
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.db import get_collection
+from common.tracing import begin_rerun, traced_run
+from recommend import Recommender
+
+# MongoDB connection setup (shared, lazily connected client configured via MONGO_URI)
+DB_NAME = 'DSA_code_app_db'  # Database name
+SUBMISSIONS = 'submissions'  # Collection name
+QUESTION_SESSIONS = 'question_sessions'  # When each user opened each question
 
 # Streamlit app setup
 st.set_page_config(page_title="DSA Practice", page_icon="🧩", layout="wide")  # Using wide layout
+begin_rerun("dsa_practice")  # Spans of this script run share one trace (see common/tracing.py)
 
 # Display the question list when no specific question is selected
 st.header("📋 Question List")
@@ -35,12 +43,25 @@ questions_df["topics"] = questions_df["topics"].apply(
 if 'Status' not in questions_df.columns:
     questions_df['Status'] = 'Pending'
 
+# Recommendation index over the catalog, rebuilt only when the CSV changes
+@st.cache_resource
+def get_recommender(path, modified, _questions):
+    return Recommender(_questions)
+
+recommender = get_recommender(QUESTIONS_FILE, os.path.getmtime(QUESTIONS_FILE), questions_df)
+
+def question_url(qid):
+    return f"http://localhost:8503/?qid={qid}"
+
+def solved_qids():
+    return [qid for qid, info in st.session_state.get('submissions', {}).items() if info["status"] == "submitted"]
+
 def get_qid(row):
     return row.QID  # Access the QID using dot notation
 
 # Function to fetch user submission data from MongoDB
 def fetch_user_submissions(username):
-    submissions = collection.find({"username": username})
+    submissions = get_collection(DB_NAME, SUBMISSIONS).find({"username": username})
     submission_data = {entry["qid"]: {"status": entry["status"], "time_taken": entry["time_taken"]}
                        for entry in submissions}
     return submission_data
@@ -86,53 +107,86 @@ def execute_code(language, code, test_case):
     """Execute code in the chosen language with given test cases."""
     input_str = test_case['input']
     output_str = test_case['output']
-    temp_file = None
-    executable = None
-    try:
+    # A directory per run: sessions running code at the same time must not overwrite each other's files.
+    with tempfile.TemporaryDirectory() as workdir:
         if language == "Python":
-            temp_file = "temp_script.py"
+            temp_file = os.path.join(workdir, "temp_script.py")
             with open(temp_file, 'w') as f:
                 f.write(f"{code}\n\nresult = function_name({input_str})\nprint(result)")
-            result = subprocess.run(['python', temp_file], capture_output=True, text=True, timeout=10)
+            result = traced_run(['python', temp_file], capture_output=True, text=True, timeout=10)
 
         elif language == "Java":
-            temp_file = "Solution.java"
+            temp_file = os.path.join(workdir, "Solution.java")
             with open(temp_file, 'w') as f:
                 f.write(code)
-            compile_result = subprocess.run(['javac', temp_file], capture_output=True, text=True, timeout=10)
+            compile_result = traced_run(['javac', temp_file], capture_output=True, text=True, timeout=10)
             if compile_result.returncode != 0:
                 return compile_result.stderr.strip()
-            result = subprocess.run(['java', 'Solution'], capture_output=True, text=True, timeout=10)
+            result = traced_run(['java', '-cp', workdir, 'Solution'], capture_output=True, text=True, timeout=10)
 
         elif language == "C":
-            temp_file = "temp_script.c"
-            executable = "temp_script.exe"  # Updated to Windows-style
+            temp_file = os.path.join(workdir, "temp_script.c")
+            executable = os.path.join(workdir, "temp_script.exe")  # Updated to Windows-style
             with open(temp_file, 'w') as f:
                 f.write(code)
-            compile_result = subprocess.run(['gcc', temp_file, '-o', executable], capture_output=True, text=True, timeout=10)
+            compile_result = traced_run(['gcc', temp_file, '-o', executable], capture_output=True, text=True, timeout=10)
             if compile_result.returncode != 0:
                 return compile_result.stderr.strip()
-            result = subprocess.run([executable], input=input_str, capture_output=True, text=True, timeout=10)
+            result = traced_run([executable], input=input_str, capture_output=True, text=True, timeout=10)
 
         elif language == "C++":
-            temp_file = "temp_script.cpp"
-            executable = "temp_script.exe"  # Updated to Windows-style
+            temp_file = os.path.join(workdir, "temp_script.cpp")
+            executable = os.path.join(workdir, "temp_script.exe")  # Updated to Windows-style
             with open(temp_file, 'w') as f:
                 f.write(code)
-            compile_result = subprocess.run(['g++', temp_file, '-o', executable], capture_output=True, text=True, timeout=10)
+            compile_result = traced_run(['g++', temp_file, '-o', executable], capture_output=True, text=True, timeout=10)
             if compile_result.returncode != 0:
                 return compile_result.stderr.strip()
-            result = subprocess.run([executable], input=input_str, capture_output=True, text=True, timeout=10)
-        
+            result = traced_run([executable], input=input_str, capture_output=True, text=True, timeout=10)
+
         # Check result
         actual_output = result.stdout.strip() if result.returncode == 0 else result.stderr.strip()
         return actual_output
-    finally:
-        # Clean up files
-        if temp_file and os.path.exists(temp_file):
-            os.remove(temp_file)
-        if executable and os.path.exists(executable):
-            os.remove(executable)
+
+@st.cache_resource
+def ensure_question_session_index():
+    get_collection(DB_NAME, QUESTION_SESSIONS).create_index([("username", ASCENDING), ("qid", ASCENDING)], unique=True)
+    return True
+
+def get_start_time(username, qid):
+    """When the user first opened the question; persisted so the timer survives reruns and reconnects."""
+    start_times = st.session_state.setdefault('start_times', {})
+    if (username, qid) not in start_times:
+        try:
+            ensure_question_session_index()
+            doc = get_collection(DB_NAME, QUESTION_SESSIONS).find_one_and_update(
+                {"username": username, "qid": qid},
+                {"$setOnInsert": {"started_at": datetime.now()}},
+                projection={"started_at": 1}, upsert=True, return_document=ReturnDocument.AFTER,
+            )
+            start_times[(username, qid)] = doc["started_at"]
+        except PyMongoError:
+            start_times[(username, qid)] = datetime.now()
+    return start_times[(username, qid)]
+
+def render_timer(elapsed_seconds):
+    """Elapsed-time clock that ticks in the browser, so no script thread is held to update it."""
+    # st.iframe replaces components.html in newer Streamlit releases.
+    embed = getattr(st, "iframe", None) or components.html
+    embed(f"""
+        <div id="timer" style="font-family: sans-serif; font-size: 16px;"></div>
+        <script>
+        const start = Date.now() - {int(elapsed_seconds * 1000)};
+        const pad = (n) => String(n).padStart(2, "0");
+        function tick() {{
+            const s = Math.floor((Date.now() - start) / 1000);
+            document.getElementById("timer").textContent =
+                `Time Elapsed: ${{pad(Math.floor(s / 3600))}}:${{pad(Math.floor(s % 3600 / 60))}}:${{pad(s % 60)}}`;
+        }}
+        tick();
+        setInterval(tick, 1000);
+        </script>
+    """, height=30)
 
 def store_submission_data(username, qid, difficulty, cleaned_topics, code_lang, time_taken):
     """Store user submission data in MongoDB."""
@@ -146,7 +200,15 @@ def store_submission_data(username, qid, difficulty, cleaned_topics, code_lang,
         "status": "submitted",  # Mark as submitted
         "timestamp": datetime.now()  # Store timestamp of submission
     }
-    collection.insert_one(submission_data)
+    # Written synchronously: the question list reads submissions back on the very next rerun.
+    get_collection(DB_NAME, SUBMISSIONS).insert_one(submission_data)
+    # The next attempt at this question starts a fresh timer.
+    try:
+        get_collection(DB_NAME, QUESTION_SESSIONS).delete_one({"username": username, "qid": qid})
+    except PyMongoError:
+        pass
+    st.session_state.get('start_times', {}).pop((username, qid), None)
+    recommender.invalidate(username)
     st.success("Data stored successfully!")
 
 # Streamlit interface setup
@@ -216,8 +278,7 @@ if username:
     
                 code = st_ace(language=ace_mode, theme='monokai', height=editor_height, value=function_structure)
     
-                if 'start_time' not in st.session_state:
-                    st.session_state['start_time'] = datetime.now()
+                start_time = get_start_time(username, selected_qid)
     
                 if 'test_case_status' not in st.session_state:
                     st.session_state['test_case_status'] = {}
@@ -245,7 +306,7 @@ if username:
     
                 if all(status == "passed" for status in st.session_state['test_case_status'].values()):
                     end_time = datetime.now()
-                    time_taken_seconds = (end_time - st.session_state['start_time']).total_seconds()
+                    time_taken_seconds = (end_time - start_time).total_seconds()
                     
                     formatted_time_taken = format_time(time_taken_seconds)
                     st.success(f"All test cases passed in {formatted_time_taken}.")
@@ -256,18 +317,29 @@ if username:
                     code_lang = language
     
                     store_submission_data(username, selected_qid, difficulty, cleaned_topics, code_lang, formatted_time_taken)
-    
-                if 'start_time' in st.session_state:
-                    timer_placeholder = st.sidebar.empty()  # Create an empty placeholder
+                    st.session_state['submissions'][selected_qid] = {"status": "submitted", "time_taken": formatted_time_taken}
+                    # Stored once: the next rerun (or question) starts with fresh test cases.
+                    st.session_state['test_case_status'] = {}
 
-                    while True:
-                        elapsed_time_seconds = (datetime.now() - st.session_state['start_time']).total_seconds()
-                        formatted_elapsed_time = format_time(elapsed_time_seconds)
-                        timer_placeholder.write(f"Time Elapsed: {formatted_elapsed_time}")
-                        time.sleep(1)  # Update every second
+                    next_qids = recommender.recommend(username, solved_qids(), 1)
+                    if next_qids:
+                        title, next_difficulty = recommender.describe(next_qids[0])
+                        st.markdown(f"[Next Question: {title} ({next_difficulty})]({question_url(next_qids[0])})")
+    
+                # The server only sends the elapsed time; the browser keeps the clock running.
+                with st.sidebar:
+                    render_timer((datetime.now() - start_time).total_seconds())
 
     else:
 
+        # Suggested next questions: unsolved, weighted toward the user's weakest topics
+        recommended = recommender.recommend(username, solved_qids())
+        if recommended:
+            st.subheader("Recommended Next")
+            for qid in recommended:
+                title, difficulty = recommender.describe(qid)
+                st.markdown(f"[{title} ({difficulty}, QID {qid})]({question_url(qid)})")
+
         # Add filters for difficulty and topics
         difficulty_level = st.selectbox("Filter by Difficulty", options=[""] + list(questions_df["difficulty"].unique()))
         
@@ -311,6 +383,8 @@ if username:
                 st.markdown("<b style='color: #1f77b4;'>Status</b>", unsafe_allow_html=True)
             with col7:
                 st.markdown("<b style='color: #1f77b4;'>Time Taken</b>", unsafe_allow_html=True)
+            with col8:
+                st.markdown("<b style='color: #1f77b4;'>Link</b>", unsafe_allow_html=True)
     
             # Display filtered results row by row
             for idx, row in enumerate(filtered_questions.itertuples(), 1):  # Start from index 1
@@ -334,6 +408,5 @@ if username:
                 with col7:
                     st.write(submission_info["time_taken"])  # Time taken for submission
                 with col8:
-                    # Directly display the clickable URL for the next question
-                    next_url = f"http://localhost:8503/?qid={qid}"
-                    st.markdown(f"[Next Question (QID {qid})]({next_url})")
\ No newline at end of file
+                    # Open this question (what to solve next is under "Recommended Next")
+                    st.markdown(f"[Open (QID {qid})]({question_url(qid)})")
\ No newline at end of file
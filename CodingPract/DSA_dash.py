@@ -1,28 +1,37 @@
+import os
+import sys
 import streamlit as st
-from pymongo import MongoClient
-import pandas as pd
-import dash
-from dash import dcc, html
-import plotly.express as px
 
-# MongoDB connection
-client = MongoClient('mongodb://localhost:27017/')
-db = client['DSA_code_app_db']
-collection = db['submissions']
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.db import get_collection
+from common.tracing import begin_rerun
+
+# MongoDB connection (shared, lazily connected client configured via MONGO_URI)
+DB_NAME = 'DSA_code_app_db'
+SUBMISSIONS = 'submissions'
 
 # Function to fetch data based on username
 def fetch_data(username):
     query = {"username": username}
-    cursor = collection.find(query)
+    cursor = get_collection(DB_NAME, SUBMISSIONS).find(query)
     data = list(cursor)
     return pd.DataFrame(data)
 
+begin_rerun("dsa_dashboard")  # Spans of this script run share one trace (see common/tracing.py)
+
 st.header("DSA Submission Overview")
 
 # Streamlit input for username
 username = st.text_input("Enter Username")
 
 if username:
+    # pandas and the charting libraries are imported only once there is data to plot
+    # (module-level, so fetch_data sees this pd too)
+    import pandas as pd
+    import dash
+    from dash import dcc, html
+    import plotly.express as px
+
     # Fetch data based on the input username
     df = fetch_data(username)
 
@@ -0,0 +1,135 @@
+"""
+Next-question recommendations for the DSA practice app.
+
+``Recommender`` is built once per question catalog (``questions_df`` after
+the topics column has been split into lists). It keeps two sparse
+question-by-feature matrices, one for topics and one for difficulty, plus
+the topic co-occurrence matrix ``topics.T @ topics``, row-normalized.
+Recommending for a user is a few sparse matrix-vector products over
+their solved set:
+
+* topic weakness - the share of each topic's questions the user has not
+  solved yet, so neglected topics rank first;
+* topic relatedness - topics that co-occur with the ones the user has
+  practised, which keeps the next question close to what they know;
+* difficulty - questions one step above the user's average solved
+  difficulty rank first, starting at the easiest level.
+
+Solved questions are masked out and the top ``n`` are picked with
+``argpartition``. Results are cached per user and ``n`` (least recently
+used entries beyond ``cache_size`` are dropped) and recomputed when the
+user's solved set changes or ``invalidate`` is called after a submission.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+DIFFICULTY_ORDER = ("Easy", "Medium", "Hard")
+RELATED_WEIGHT = 0.5
+DIFFICULTY_WEIGHT = 1.0
+CACHE_SIZE = 1000
+
+
+class Recommender:
+    """Rank unsolved questions of one catalog for a user's solved set."""
+
+    def __init__(self, questions_df, cache_size=CACHE_SIZE):
+        questions = questions_df[questions_df["isPaidOnly"] == False].reset_index(drop=True)
+        self.qids = pd.Index(questions["QID"])
+        self.titles = questions["title"].to_numpy()
+        self.difficulties = questions["difficulty"].to_numpy()
+
+        topics = questions["topics"].explode().dropna().astype(str).str.strip()
+        pairs = pd.DataFrame({"row": topics.index, "topic": topics.to_numpy()})
+        pairs = pairs[pairs["topic"] != ""].drop_duplicates()
+        self.topics = pd.Index(sorted(pairs["topic"].unique()))
+        self.topic_matrix = sparse.csr_matrix(
+            (np.ones(len(pairs)), (pairs["row"].to_numpy(), self.topics.get_indexer(pairs["topic"]))),
+            shape=(len(questions), len(self.topics)),
+        )
+
+        levels = [d for d in DIFFICULTY_ORDER if d in set(self.difficulties)]
+        levels += sorted(set(self.difficulties) - set(levels))
+        self.levels = pd.Index(levels)
+        level_of = self.levels.get_indexer(self.difficulties)
+        self.difficulty_matrix = sparse.csr_matrix(
+            (np.ones(len(questions)), (np.arange(len(questions)), level_of)),
+            shape=(len(questions), len(self.levels)),
+        )
+
+        self.topic_counts = np.asarray(self.topic_matrix.sum(axis=0)).ravel()
+        cooccurrence = (self.topic_matrix.T @ self.topic_matrix).tocsr()
+        cooccurrence.setdiag(0)
+        cooccurrence.eliminate_zeros()
+        totals = np.asarray(cooccurrence.sum(axis=1)).ravel()
+        self.topic_links = sparse.diags(1 / np.maximum(totals, 1)) @ cooccurrence
+        # Questions with many topics should not outrank focused ones just by summing more weights.
+        self._topics_per_question = np.maximum(np.asarray(self.topic_matrix.sum(axis=1)).ravel(), 1)
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def solved_vector(self, solved_qids):
+        """0/1 vector over the catalog rows; unknown or paid QIDs are ignored."""
+        rows = self.qids.get_indexer(list(solved_qids))
+        solved = np.zeros(len(self.qids))
+        solved[rows[rows >= 0]] = 1
+        return solved
+
+    def scores(self, solved):
+        """Score of every question for the solved vector; solved questions get -inf."""
+        practised = self.topic_matrix.T @ solved
+        weakness = 1 - practised / np.maximum(self.topic_counts, 1)
+        related = self.topic_links.T @ practised
+        if related.size and related.max() > 0:
+            related = related / related.max()
+        topic_weights = weakness * (1 - RELATED_WEIGHT + RELATED_WEIGHT * related)
+        scores = (self.topic_matrix @ topic_weights) / self._topics_per_question
+
+        solved_levels = self.difficulty_matrix.T @ solved
+        if solved_levels.sum():
+            average = (solved_levels @ np.arange(len(self.levels))) / solved_levels.sum()
+            target = min(len(self.levels) - 1, average + 0.5)
+        else:
+            target = 0
+        level_weights = 1 / (1 + np.abs(np.arange(len(self.levels)) - target))
+        scores = scores + DIFFICULTY_WEIGHT * (self.difficulty_matrix @ level_weights)
+        scores[solved > 0] = -np.inf
+        return scores
+
+    def recommend(self, username, solved_qids, n=5):
+        """QIDs of the top ``n`` unsolved questions for the user, best first."""
+        key = frozenset(solved_qids)
+        with self._lock:
+            cached = self._cache.get((username, n))
+            if cached is not None and cached[0] == key:
+                self._cache.move_to_end((username, n))
+                return cached[1]
+        scores = self.scores(self.solved_vector(key))
+        count = min(n, int(np.isfinite(scores).sum()))
+        if count == 0:
+            top = []
+        else:
+            best = np.argpartition(-scores, count - 1)[:count]
+            top = [int(qid) for qid in self.qids[best[np.argsort(-scores[best], kind="stable")]]]
+        with self._lock:
+            self._cache[(username, n)] = (key, top)
+            self._cache.move_to_end((username, n))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return top
+
+    def invalidate(self, username):
+        """Forget the user's cached recommendations (after a new submission)."""
+        with self._lock:
+            for cached in [cached for cached in self._cache if cached[0] == username]:
+                del self._cache[cached]
+
+    def describe(self, qid):
+        """``(title, difficulty)`` of a catalog question."""
+        row = self.qids.get_loc(qid)
+        return self.titles[row], self.difficulties[row]
@@ -1,44 +1,75 @@
 import streamlit as st
-import openai
-import time
 import os
-import json
-import google.generativeai as genai
-import numpy as np
-import speech_recognition as sr
-import cv2
-from datetime import datetime
-from pymongo import MongoClient
+import sys
+import threading
+import uuid
 from dotenv import load_dotenv
-from streamlit_webrtc import webrtc_streamer, VideoTransformerBase, RTCConfiguration
-from PIL import Image as PILImage
+from pymongo.errors import PyMongoError
+from streamlit_webrtc import webrtc_streamer, RTCConfiguration
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.db import get_writer
+from common.gemini import generative_model
+from common.tracing import begin_rerun
+from evaluation import DONE, FAILED, EVALUATION_TIMEOUT, AnswerEvaluator, evaluation_key
+from history import InterviewHistory, local_time, new_interview_time
+from question_bank import QuestionBank
+from scoring import score_interview
+from telemetry import start_metrics_server
 
 # ---------------------------
 # Environment and API Configuration
 # ---------------------------
+# (The Gemini SDK is imported and configured on first use, see common/gemini.py.)
 load_dotenv()
-genai.configure(api_key=os.getenv('API_KEY'))
+# Spans of this script run share one trace (see common/tracing.py).
+begin_rerun("mockinter")
 
 # ---------------------------
-# MongoDB Connection (for interview feedback and face logs)
+# MongoDB Connection (for interview feedback; face logs go through proctoring.py)
+# Shared, lazily connected client; inserts are batched by a write-behind buffer.
 # ---------------------------
-client = MongoClient("mongodb://localhost:27017/")
-db = client["mock_interviews"]
-feedback_collection = db["feedbacks"]
-
-
-def store_face_log(student_id, message):
-    """Log proctoring violations in the database."""
-    collection = db["face_logs"]
-    log_data = {
-        "student_id": student_id,
-        "timestamp": datetime.now(),
-        "violation": message
-    }
-    try:
-        collection.insert_one(log_data)
-    except Exception as e:
-        st.error(f"Error logging face violation: {e}")
+DB_NAME = "mock_interviews"
+feedback_writer = get_writer(DB_NAME, "feedbacks")
+
+
+# ---------------------------
+# Load detection models once per process, before the first session needs them.
+# This runs in a background thread so OpenCV does not delay the first render.
+# ---------------------------
+@st.cache_resource
+def warm_up_models():
+    def run():
+        from models import warm_up
+        warm_up()
+
+    thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def make_video_transformer():
+    # OpenCV and the detection stack are imported when the camera starts.
+    from proctoring import VideoTransformer
+    return VideoTransformer()
+
+
+def make_audio_processor():
+    # numpy and the VAD are imported when the microphone starts.
+    from transcription import AnswerAudioProcessor
+    return AnswerAudioProcessor()
+
+
+warm_up_models()
+
+
+@st.cache_resource
+def metrics_server():
+    # Prometheus text endpoint aggregating all streams of this process.
+    return start_metrics_server()
+
+
+metrics_server()
 
 
 # ---------------------------
@@ -53,156 +84,10 @@ def rerun_app():
         st.error("Rerun not supported in this version of Streamlit. Please upgrade Streamlit.")
 
 
-# ---------------------------
-# Video Transformer with Proctoring Enhancements
-# (Handles No Face, Multiple Faces, and Improved Eye-Gaze Detection)
-# ---------------------------
-class VideoTransformer(VideoTransformerBase):
-    def __init__(self):
-        # Load Haar Cascades for face and eye detection.
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-        self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_eye.xml")
-
-        # Warning counters and timers.
-        self.no_face_warning_count = 0
-        self.multiple_face_warning_count = 0
-        self.eye_gaze_warning_count = 0
-        self.last_no_face_warning_time = time.time()
-        self.last_multiple_warning_time = time.time()
-        self.last_eye_gaze_warning_time = time.time()
-        self.test_terminated = False
-
-        # Smoothing parameters: count consecutive frames for face detections.
-        self.no_face_frames = 0
-        self.multiple_face_frames = 0
-        self.frame_threshold = 5  # For face and multiple face detection
-
-        # Timing thresholds.
-        self.warning_interval = 2  # seconds between warnings.
-        self.warning_limit = 10  # number of warnings before termination.
-
-        # Control for proctoring activation.
-        self.proctoring_enabled = False
-
-        # Optional: student id to log violations.
-        self.student_id = None
-
-    def transform(self, frame):
-        img = frame.to_ndarray(format="bgr24")
-
-        # If proctoring is not enabled, simply return the frame.
-        if not self.proctoring_enabled:
-            return img
-
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        current_time = time.time()
-        violation_message = None
-
-        # ---------------------------
-        # No Face Detection
-        # ---------------------------
-        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
-        if len(faces) == 0:
-            self.no_face_frames += 1
-            if self.no_face_frames >= self.frame_threshold:
-                if current_time - self.last_no_face_warning_time > self.warning_interval:
-                    self.no_face_warning_count += 1
-                    self.last_no_face_warning_time = current_time
-                    if self.student_id:
-                        store_face_log(self.student_id, "No Face Detected!")
-                violation_message = "No Face Detected!"
-        else:
-            self.no_face_frames = 0
-
-        # ---------------------------
-        # Multiple Faces Detection
-        # ---------------------------
-        if len(faces) > 1:
-            self.multiple_face_frames += 1
-            if self.multiple_face_frames >= self.frame_threshold:
-                if current_time - self.last_multiple_warning_time > self.warning_interval:
-                    self.multiple_face_warning_count += 1
-                    self.last_multiple_warning_time = current_time
-                    if self.student_id:
-                        store_face_log(self.student_id, "Multiple Faces Detected!")
-                violation_message = "Multiple Faces Detected!"
-        else:
-            self.multiple_face_frames = 0
-
-        # Draw rectangles around detected faces.
-        for (x, y, w, h) in faces:
-            cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-        # ---------------------------
-        # Improved Eye-Gaze Detection (Ensure Eyes Look at Screen)
-        # ---------------------------
-        # Process only if exactly one face is detected.
-        if len(faces) == 1:
-            (fx, fy, fw, fh) = faces[0]
-            face_roi_gray = gray[fy:fy + fh, fx:fx + fw]
-            eyes = self.eye_cascade.detectMultiScale(face_roi_gray, scaleFactor=1.1, minNeighbors=5)
-            # Draw rectangles around detected eyes.
-            for (ex, ey, ew, eh) in eyes:
-                cv2.rectangle(img, (fx + ex, fy + ey), (fx + ex + ew, fy + ey + eh), (255, 0, 0), 2)
-
-            eye_violation = False
-            # If fewer than two eyes are detected, treat as a violation.
-            if len(eyes) < 2:
-                eye_violation = True
-            else:
-                # Check each detected eye.
-                for (ex, ey, ew, eh) in eyes:
-                    eye_roi = face_roi_gray[ey:ey + eh, ex:ex + ew]
-                    eye_roi = cv2.equalizeHist(eye_roi)
-                    _, thresholded = cv2.threshold(eye_roi, 30, 255, cv2.THRESH_BINARY_INV)
-                    contours, _ = cv2.findContours(thresholded, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-                    if contours:
-                        max_contour = max(contours, key=cv2.contourArea)
-                        M = cv2.moments(max_contour)
-                        if M["m00"] != 0:
-                            cx = int(M["m10"] / M["m00"])
-                            # The pupil must be near the center of the eye.
-                            # If it's too far left or right, flag as a violation.
-                            if cx < ew / 4 or cx > 3 * ew / 4:
-                                eye_violation = True
-                    else:
-                        eye_violation = True
-
-            # Continuously show the warning if a violation is detected.
-            if eye_violation:
-                violation_message = "Not Looking at Screen!"
-                if current_time - self.last_eye_gaze_warning_time > self.warning_interval:
-                    self.eye_gaze_warning_count += 1
-                    self.last_eye_gaze_warning_time = current_time
-                    if self.student_id:
-                        store_face_log(self.student_id, "Not Looking at Screen!")
-
-        # ---------------------------
-        # Persistent Overlay of Violation Message
-        # ---------------------------
-        if violation_message:
-            overlay = img.copy()
-            cv2.rectangle(overlay, (0, 0), (img.shape[1], img.shape[0]), (0, 0, 255), -1)
-            alpha = 0.4
-            cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = img.shape[1] / 800
-            thickness = max(2, int(img.shape[1] / 400))
-            text_size, _ = cv2.getTextSize(violation_message, font, font_scale, thickness)
-            text_x = (img.shape[1] - text_size[0]) // 2
-            text_y = (img.shape[0] + text_size[1]) // 2
-            cv2.putText(img, violation_message, (text_x, text_y), font, font_scale, (255, 255, 255), thickness,
-                        cv2.LINE_AA)
-
-        # ---------------------------
-        # Check if Warning Limits Exceeded (terminate interview if so)
-        # ---------------------------
-        if (self.no_face_warning_count >= self.warning_limit or
-                self.multiple_face_warning_count >= self.warning_limit or
-                self.eye_gaze_warning_count >= self.warning_limit):
-            self.test_terminated = True
-
-        return img
+def live_fragment(run_every):
+    # Partial reruns on a timer where this Streamlit version supports them.
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    return fragment(run_every=run_every) if fragment else (lambda f: f)
 
 
 # ---------------------------
@@ -217,7 +102,7 @@ RTC_CONFIGURATION = RTCConfiguration({
 # Interview Functions (Remaining parts unchanged)
 # ---------------------------
 def get_gemini_questions(job_role, tech_stack, experience):
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = generative_model('gemini-1.5-flash')
     prompt = f"""
     Generate five interview questions for a {job_role} role requiring experience in {tech_stack}. 
     The candidate has {experience} years of experience. Ensure the questions assess relevant skills and knowledge.
@@ -228,14 +113,38 @@ def get_gemini_questions(job_role, tech_stack, experience):
     for question in questions:
         question = question.strip()
         if question and question[0].isdigit():
+            # Drop the "1." numbering: banked questions are re-sampled in any order.
+            question = question.lstrip("0123456789").lstrip(".) ").strip()
             if not question.endswith("?"):
                 question += "?"
             filtered_questions.append(question)
     return filtered_questions
 
 
+# Roles our students ask for most; their question pools are generated ahead of time.
+POPULAR_INTERVIEWS = [
+    ("Full Stack Developer", "React, Node.js", 2),
+    ("Frontend Developer", "React, JavaScript", 0),
+    ("Backend Developer", "Python, Django", 2),
+    ("Data Scientist", "Python, Machine Learning", 2),
+    ("Java Developer", "Java, Spring Boot", 2),
+]
+
+
+@st.cache_resource
+def get_question_bank():
+    # Questions are served from a persistent bank; Gemini is only called to grow it.
+    bank = QuestionBank(get_gemini_questions, DB_NAME)
+    bank.start_prewarm(POPULAR_INTERVIEWS)
+    return bank
+
+
+# Create the bank when the app starts so the popular pools fill before the first interview.
+get_question_bank()
+
+
 def process_answer(question, answer):
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = generative_model('gemini-1.5-flash')
     prompt = f"""
     Evaluate the following candidate's answer to an interview question. 
     Provide a score out of 10 based on correctness, depth, and relevance, and give detailed feedback.
@@ -247,25 +156,61 @@ def process_answer(question, answer):
     return response.text
 
 
-def record_audio():
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        st.write("Recording... Speak now!")
-        audio = recognizer.listen(source, timeout=5)
-    try:
-        text = recognizer.recognize_google(audio)
-        return text
-    except sr.UnknownValueError:
-        return "Could not understand audio"
-    except sr.RequestError:
-        return "Could not request results"
+@st.cache_resource
+def get_answer_evaluator():
+    # Answers are graded in the background and stored once their feedback arrives.
+    return AnswerEvaluator(process_answer, feedback_writer)
+
+
+@st.cache_resource
+def get_interview_history():
+    # One document per interview, listed page by page (see history.py).
+    return InterviewHistory(DB_NAME)
+
+
+def proctoring_summary(camera):
+    transformer = getattr(camera, "video_transformer", None) if camera is not None else None
+    if transformer is None:
+        return None
+    return {
+        "no_face_warnings": transformer.no_face_warning_count,
+        "multiple_face_warnings": transformer.multiple_face_warning_count,
+        "eye_gaze_warnings": transformer.eye_gaze_warning_count,
+    }
+
+
+# ---------------------------
+# Answer recording: browser microphone -> VAD segments -> incremental transcript
+# ---------------------------
+def join_answer(*parts):
+    return " ".join(part.strip() for part in parts if part and part.strip())
+
+
+def start_recording(audio_processor, answer_key, recorded_key):
+    # Keep what was typed so far; the transcript is appended to it.
+    st.session_state[recorded_key] = st.session_state.get(answer_key, "")
+    from transcription import StreamingTranscriber
+    st.session_state.transcriber = StreamingTranscriber()
+    audio_processor.transcriber = st.session_state.transcriber
+
+
+def finish_recording(audio_processor):
+    transcriber = st.session_state.pop("transcriber", None)
+    if audio_processor is not None:
+        audio_processor.transcriber = None
+    return transcriber.finish() if transcriber is not None else ""
+
+
+def stop_recording(audio_processor, answer_key, recorded_key):
+    st.session_state[answer_key] = join_answer(st.session_state[recorded_key], finish_recording(audio_processor))
 
 
 # ---------------------------
 # Streamlit Session State Setup
 # ---------------------------
-if "interviews" not in st.session_state:
-    st.session_state.interviews = []
+if "history_pages" not in st.session_state:
+    # Previous interviews loaded so far for history_user, and the cursor of the next page.
+    st.session_state.history_pages = {"username": None, "interviews": [], "next": None}
 
 # ---------------------------
 # Sidebar: Live Camera Feed (Proctoring)
@@ -274,15 +219,25 @@ with st.sidebar:
     st.title("Live Camera Feed")
     camera = webrtc_streamer(
         key="camera",
-        video_transformer_factory=VideoTransformer,
+        video_transformer_factory=make_video_transformer,
+        audio_processor_factory=make_audio_processor,
         rtc_configuration=RTC_CONFIGURATION,
         async_processing=True,
-        media_stream_constraints={"video": True, "audio": False}
+        media_stream_constraints={"video": True, "audio": True}
     )
     if camera and hasattr(camera, "video_transformer") and camera.video_transformer is not None:
         st.markdown(f"**No Face Warnings:** {camera.video_transformer.no_face_warning_count}")
         st.markdown(f"**Multiple Face Warnings:** {camera.video_transformer.multiple_face_warning_count}")
         st.markdown(f"**Eye-Gaze Warnings:** {camera.video_transformer.eye_gaze_warning_count}")
+        stats = camera.video_transformer.telemetry.snapshot()
+        with st.expander("Stream Health"):
+            st.markdown(f"**FPS:** {stats['fps']:.1f}")
+            st.markdown(f"**Frame Latency (p95):** {stats['p95_ms']:.1f} ms")
+            for stage, ms in stats["stage_ms"].items():
+                st.text(f"{stage}: {ms:.2f} ms")
+            st.markdown(f"**Dropped Frames:** {stats['dropped_frames']}")
+            st.markdown(f"**Skipped Analyses:** {stats['analysis_skipped']}")
+            st.markdown(f"**Queue Depth:** {stats['queue_depth']}")
 
 # ---------------------------
 # Main Interface: Interview Creation (when no active interview)
@@ -299,28 +254,43 @@ if "current_interview" not in st.session_state:
             job_role = st.text_input("Job Role/Job Position", placeholder="Ex. Full Stack Developer")
             tech_stack = st.text_input("Job Description/Tech Stack", placeholder="Ex. React, Angular, Node.js")
             experience = st.number_input("Years of Experience", min_value=0, step=1)
+            proctoring_on = st.checkbox("Proctoring", value=True)
+            emotions_on = st.checkbox("Track emotions", value=False,
+                                      help="Classify the face found by proctoring a few times per second.")
+            batch_scoring = st.checkbox("Score all answers at the end", value=False,
+                                        help="One structured request with numeric scores instead of one per answer.")
             start_btn = st.form_submit_button("Start Interview")
             cancel_btn = st.form_submit_button("Cancel")
             if cancel_btn:
                 st.session_state.show_form = False
                 rerun_app()
             if start_btn and username and job_role and tech_stack:
-                questions = get_gemini_questions(job_role, tech_stack, experience)
+                questions = get_question_bank().get_questions(username, job_role, tech_stack, experience)
                 interview_data = {
+                    "interview_id": uuid.uuid4().hex,
+                    "created_at": new_interview_time(),
                     "username": username,
                     "role": job_role,
                     "stack": tech_stack,
                     "experience": experience,
                     "questions": questions,
+                    "pipeline": {"proctoring": proctoring_on, "emotions": emotions_on, "batch_scoring": batch_scoring},
                     "responses": []
                 }
                 st.session_state.current_interview = interview_data
-                st.session_state.interviews.append(interview_data)
+                st.session_state.history_username = username
+                get_interview_history().save(interview_data)
                 st.session_state.show_form = False
                 st.session_state.question_index = 0
-                # Enable proctoring and set student_id.
+                # One frame pipeline: the proctoring face detection also feeds the emotion tracker.
+                if emotions_on:
+                    from emotion import EmotionTracker
+                    st.session_state.emotion_tracker = EmotionTracker()
+                else:
+                    st.session_state.emotion_tracker = None
                 if camera is not None and hasattr(camera, "video_transformer") and camera.video_transformer is not None:
-                    camera.video_transformer.proctoring_enabled = True
+                    camera.video_transformer.proctoring_enabled = proctoring_on
+                    camera.video_transformer.emotion_tracker = st.session_state.emotion_tracker
                     camera.video_transformer.student_id = username
                 rerun_app()
 
@@ -336,69 +306,192 @@ if "current_interview" in st.session_state:
         st.text(f"Tech Stack: {interview['stack']}")
         st.text(f"Years of Experience: {interview['experience']}")
         index = st.session_state.question_index
+        tracker = st.session_state.get("emotion_tracker")
         if index < len(interview["questions"]):
+            if tracker is not None:
+                tracker.start_question(index)
             st.subheader(f"Question #{index + 1}")
             st.write(interview["questions"][index])
             answer_widget_key = f"answer_{index}"
             recorded_key = f"recorded_answer_{index}"
-            # Initialize recorded answer key if not present.
+            # Initialize the answer keys if not present.
             if recorded_key not in st.session_state:
                 st.session_state[recorded_key] = ""
-            # Use the recorded answer as the default value for the text area.
-            answer = st.text_area("Your Answer", key=answer_widget_key,
-                                  value=st.session_state.get(recorded_key, ""))
+            if answer_widget_key not in st.session_state:
+                st.session_state[answer_widget_key] = ""
+            audio_processor = getattr(camera, "audio_processor", None)
+            recording = st.session_state.get("transcriber") is not None
+
+            # While recording, the text area refreshes every second with the partial transcript.
+            @live_fragment(run_every=1.0 if recording else None)
+            def answer_box():
+                transcriber = st.session_state.get("transcriber")
+                if transcriber is not None:
+                    st.session_state[answer_widget_key] = join_answer(st.session_state[recorded_key],
+                                                                      transcriber.text())
+                st.text_area("Your Answer", key=answer_widget_key, disabled=transcriber is not None)
+                if transcriber is not None:
+                    st.caption(f"Listening... ({transcriber.pending()} segment(s) being transcribed)")
+
+            answer_box()
             col1, col2 = st.columns(2)
             with col1:
-                if st.button("Record Answer", key=f"record_{index}"):
-                    st.session_state[recorded_key] = record_audio()
-                    rerun_app()
+                if recording:
+                    st.button("Stop Recording", key=f"stop_{index}", on_click=stop_recording,
+                              args=(audio_processor, answer_widget_key, recorded_key))
+                else:
+                    st.button("Record Answer", key=f"record_{index}", disabled=audio_processor is None,
+                              on_click=start_recording, args=(audio_processor, answer_widget_key, recorded_key))
             with col2:
                 if st.button("Next Question", key=f"next_{index}"):
                     answer = st.session_state.get(answer_widget_key, "")
-                    feedback = process_answer(interview["questions"][index], answer)
+                    if recording:
+                        answer = join_answer(st.session_state[recorded_key], finish_recording(audio_processor))
                     response_data = {
                         "username": interview["username"],
+                        "interview_id": interview["interview_id"],
                         "question": interview["questions"][index],
                         "answer": answer,
-                        "feedback": feedback
+                        "feedback": None,
+                        "evaluation_key": evaluation_key(interview["interview_id"], index, answer)
                     }
-                    feedback_collection.insert_one(response_data)
-                    interview["responses"].append(response_data)
+                    if tracker is not None:
+                        summary = tracker.end_question(index)
+                        response_data.update({
+                            "emotion": summary["dominant"],
+                            "emotion_distribution": summary["distribution"],
+                            "emotion_timeline": summary["timeline"],
+                            "emotion_bucket_seconds": summary["bucket_seconds"],
+                        })
+                    # Graded and persisted in the background (or all together at the end in batch mode);
+                    # a repeated click reuses the same evaluation.
+                    if not interview["pipeline"]["batch_scoring"]:
+                        get_answer_evaluator().submit(response_data["evaluation_key"], response_data["question"],
+                                                      answer, response_data)
+                    if not any(r["evaluation_key"] == response_data["evaluation_key"] for r in interview["responses"]):
+                        interview["responses"].append(response_data)
                     st.session_state.question_index += 1
                     rerun_app()
         else:
-            # Disable proctoring once the final answer is submitted.
-            if camera is not None and hasattr(camera, "video_transformer"):
+            # Disable proctoring and emotion sampling once the final answer is submitted.
+            if getattr(camera, "video_transformer", None) is not None:
                 camera.video_transformer.proctoring_enabled = False
+                camera.video_transformer.emotion_tracker = None
 
             st.success("Interview Completed!")
             st.markdown("## Interview Summary")
+            evaluator = get_answer_evaluator()
+            if interview["pipeline"]["batch_scoring"] and not interview.get("scored"):
+                items = [(r["question"], r["answer"]) for r in interview["responses"]]
+                try:
+                    with st.spinner("Scoring your interview..."):
+                        scores = score_interview(items, timeout=EVALUATION_TIMEOUT)
+                except Exception:
+                    scores = [None] * len(items)
+                for response, result in zip(interview["responses"], scores):
+                    if result is None:
+                        # Not scored in the batch: fall back to evaluating this answer on its own.
+                        evaluator.submit(response["evaluation_key"], response["question"], response["answer"], response)
+                        continue
+                    response.update(result, scoring="batch")
+                    feedback_writer.write(dict(response, _id=response["evaluation_key"]))
+                feedback_writer.flush()
+                # Only now has every answer been scored or handed to the evaluator.
+                interview["scored"] = True
+            keys = [r["evaluation_key"] for r in interview["responses"] if r["feedback"] is None]
+            if keys:
+                with st.spinner("Evaluating your answers..."):
+                    evaluator.collect(keys, timeout=EVALUATION_TIMEOUT)
+            for response in interview["responses"]:
+                if response["feedback"] is None and evaluator.status(response["evaluation_key"]) == DONE:
+                    response["feedback"] = evaluator.result(response["evaluation_key"])
+                    # The interview holds the feedback now; the shared evaluator need not.
+                    evaluator.forget([response["evaluation_key"]])
+            completed = sum(r["feedback"] is not None for r in interview["responses"])
+            st.text(f"Evaluations completed: {completed}/{len(interview['responses'])}")
+            if interview.get("saved_evaluated") != completed:
+                if get_interview_history().save(interview, proctoring_summary(camera), completed=True):
+                    interview["saved_evaluated"] = completed
             for idx, response in enumerate(interview["responses"]):
                 with st.expander(f"Question {idx + 1}: {response['question']}"):
                     st.markdown(f"**Your Answer:** {response['answer']}")
-                    st.markdown(f"**Feedback:** {response['feedback']}")
+                    status = evaluator.status(response["evaluation_key"])
+                    if "score" in response:
+                        st.markdown(f"**Score:** {response['score']:.1f}/10")
+                        st.text("  ".join(f"{k}: {v:.1f}" for k, v in response["rubric"].items()))
+                    if response["feedback"] is not None:
+                        st.markdown(f"**Feedback:** {response['feedback']}")
+                    elif status == FAILED or status is None:
+                        st.markdown("**Feedback:** Evaluation failed.")
+                        if st.button("Retry", key=f"retry_{idx}"):
+                            evaluator.submit(response["evaluation_key"], response["question"],
+                                             response["answer"], response)
+                            rerun_app()
+                    else:
+                        st.markdown("**Feedback:** Still evaluating...")
+                    if "emotion" in response:
+                        st.markdown(f"**Emotion:** {response['emotion']}")
+            if completed < len(interview["responses"]) and st.button("Refresh Feedback"):
+                rerun_app()
             if st.button("Close Interview"):
                 # Reset warning counters.
-                if camera is not None and hasattr(camera, "video_transformer"):
+                if getattr(camera, "video_transformer", None) is not None:
                     camera.video_transformer.no_face_warning_count = 0
                     camera.video_transformer.multiple_face_warning_count = 0
                     camera.video_transformer.eye_gaze_warning_count = 0
                 # Clear interview session state.
+                evaluator.forget([r["evaluation_key"] for r in interview["responses"]])
                 del st.session_state["current_interview"]
                 del st.session_state["question_index"]
+                st.session_state.pop("emotion_tracker", None)
+                # Reload the history so it starts with this interview.
+                st.session_state.history_pages["username"] = None
                 rerun_app()
 
 # ---------------------------
-# Previous Mock Interviews (when no active interview)
+# Previous Mock Interviews (when no active interview), newest first, one page at a time
 # ---------------------------
-if "current_interview" not in st.session_state and st.session_state.interviews:
-    st.subheader("Previous Mock Interviews")
-    for i, interview in enumerate(st.session_state.interviews):
-        with st.expander(
-                f"{interview['role']} - {interview['experience']} Years (Created At: {datetime.now().strftime('%Y-%m-%d')})"
-        ):
-            st.write(f"Tech Stack: {interview['stack']}")
-            for response in interview["responses"]:
-                st.write(f"**Q:** {response['question']}")
-                st.write(f"**Your Answer:** {response['answer']}")
-                st.write(f"**Feedback:** {response['feedback']}")
+if "current_interview" not in st.session_state:
+    history = get_interview_history()
+    history_user = st.text_input("Show previous interviews for", value=st.session_state.get("history_username", ""),
+                                 placeholder="Enter your username")
+    st.session_state.history_username = history_user
+    pages = st.session_state.history_pages
+    if history_user and pages["username"] != history_user:
+        try:
+            interviews, cursor = history.page(history_user)
+        except PyMongoError:
+            interviews, cursor = [], None
+            st.warning("Previous interviews are not available right now.")
+        pages.update(username=history_user, interviews=interviews, next=cursor)
+    if history_user and pages["interviews"]:
+        st.subheader("Previous Mock Interviews")
+        for stored in pages["interviews"]:
+            summary = stored.get("summary", {})
+            score = f", Score {summary['average_score']}/10" if summary.get("average_score") is not None else ""
+            with st.expander(
+                    f"{stored['role']} - {stored['experience']} Years "
+                    f"(Created At: {local_time(stored['created_at']).strftime('%Y-%m-%d')}{score})"
+            ):
+                st.write(f"Tech Stack: {stored['stack']}")
+                st.write(f"Answered: {summary.get('answered', 0)}")
+                if st.button("Show answers", key=f"history_{stored['_id']}"):
+                    try:
+                        full = history.get(history_user, stored["_id"]) or {}
+                    except PyMongoError:
+                        full = {}
+                        st.warning("The answers are not available right now.")
+                    for answer in full.get("answers", []):
+                        st.write(f"**Q:** {answer['question']}")
+                        st.write(f"**Your Answer:** {answer['answer']}")
+                        st.write(f"**Feedback:** {answer.get('feedback') or 'Not available'}")
+        if pages["next"] is not None and st.button("Load more"):
+            try:
+                interviews, cursor = history.page(history_user, after=pages["next"])
+            except PyMongoError:
+                interviews, cursor = [], pages["next"]
+                st.warning("Previous interviews are not available right now.")
+            pages["interviews"].extend(interviews)
+            pages["next"] = cursor
+            if interviews:
+                rerun_app()
@@ -1,31 +1,37 @@
 import streamlit as st
-import openai
-import time
 import os
-import json
-import google.generativeai as genai
-import numpy as np
-import speech_recognition as sr
+import sys
 from datetime import datetime
-from pymongo import MongoClient
 from dotenv import load_dotenv
-from deepface import DeepFace
-import cv2
-from PIL import Image
-import threading
+from streamlit_webrtc import webrtc_streamer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.db import get_writer
+from common.gemini import generative_model
+from common.tracing import begin_rerun
+from emotion import EmotionTracker, NO_EMOTION, warm_up_emotion_worker
+from transcription import AnswerAudioProcessor, StreamingTranscriber
 
 # Load environment variables
 load_dotenv()
 
-genai.configure(api_key=os.getenv('API_KEY'))
+# Spans of this script run share one trace (see common/tracing.py)
+begin_rerun("mockinter_emotion")
+
+# Connect to MongoDB (shared, lazily connected client; inserts are batched)
+DB_NAME = "mock_interviews"
+feedback_writer = get_writer(DB_NAME, "feedbacks")
 
-# Connect to MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client["mock_interviews"]
-feedback_collection = db["feedbacks"]
+# Start the DeepFace worker process now: the pool only spawns it on the first submit,
+# so a warm-up task makes it build the emotion model before the first analyzed frame.
+@st.cache_resource
+def start_emotion_worker():
+    return warm_up_emotion_worker()
+
+start_emotion_worker()
 
 def get_gemini_questions(job_role, tech_stack, experience):
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = generative_model('gemini-1.5-flash')
     prompt = f"""
     Generate five interview questions for a {job_role} role requiring experience in {tech_stack}. 
     The candidate has {experience} years of experience. Ensure the questions assess relevant skills and knowledge.
@@ -44,7 +50,7 @@ def get_gemini_questions(job_role, tech_stack, experience):
     return filtered_questions
 
 def process_answer(question, answer, avg_emotion):
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = generative_model('gemini-1.5-flash')
     prompt = f"""
     Evaluate the following candidate's answer to an interview question. 
     Provide a score out of 10 based on correctness, depth, and relevance, and give detailed feedback.
@@ -56,68 +62,47 @@ def process_answer(question, answer, avg_emotion):
     response = model.generate_content([prompt])
     return response.text
 
-def record_audio():
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        st.write("Recording... Speak now!")
-        audio = recognizer.listen(source, timeout=5)
-    try:
-        text = recognizer.recognize_google(audio)
-        return text
-    except sr.UnknownValueError:
-        return "Could not understand audio"
-    except sr.RequestError:
-        return "Could not request results"
-
-# Track emotions in the background
-emotion_list = []
-emotion_lock = threading.Lock()
-
-def track_emotions_from_webcam():
-    global emotion_list
-    cap = cv2.VideoCapture(0)
-
-    if not cap.isOpened():
-        st.error("Could not access the webcam")
-        return None
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            st.error("Failed to grab frame from webcam")
-            break
-
-        try:
-            # Analyze emotion using DeepFace
-            result = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
-            dominant_emotion = result[0]['dominant_emotion']
-            
-            # Use a lock to safely update the shared emotion list
-            with emotion_lock:
-                emotion_list.append(dominant_emotion)
-
-        except Exception as e:
-            st.write("Error in emotion detection:", e)
-        
-        # Display webcam feed in Streamlit (just to show webcam)
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(frame_rgb)
-        st.image(img, caption="Live Webcam Feed", use_column_width=True)
-
-        # Stop button to end emotion tracking
-        if st.button("Stop Emotion Tracking"):
-            break
-
-    cap.release()
-
-# Get the dominant emotion from the list of detected emotions
-def get_avg_emotion():
-    with emotion_lock:
-        if emotion_list:
-            avg_emotion = max(set(emotion_list), key=emotion_list.count)  # Mode of the emotions
-            return avg_emotion
-        else:
-            return "No emotions detected"
+# Record answers from the browser microphone: speech segments are transcribed
+# while the candidate talks (see transcription.py)
+def start_recording(audio_processor):
+    st.session_state.transcriber = StreamingTranscriber()
+    audio_processor.transcriber = st.session_state.transcriber
+
+def stop_recording(audio_processor):
+    transcriber = st.session_state.pop("transcriber", None)
+    if audio_processor is not None:
+        audio_processor.transcriber = None
+    return transcriber.finish() if transcriber is not None else ""
+
+# Track emotions in the background: one sampler per session, analysed at a
+# limited rate in the DeepFace worker process (see emotion.py)
+def start_emotion_tracking():
+    tracker = st.session_state.get("emotion_tracker")
+    if tracker is not None:
+        tracker.stop()
+    tracker = EmotionTracker()
+    tracker.start(0)
+    st.session_state.emotion_tracker = tracker
+
+def stop_emotion_tracking():
+    tracker = st.session_state.pop("emotion_tracker", None)
+    if tracker is not None:
+        tracker.stop()
+
+# Mark when a question is first shown, so its emotions can be told apart from the others
+def start_question_emotion(index):
+    tracker = st.session_state.get("emotion_tracker")
+    if tracker is not None:
+        tracker.start_question(index)
+
+# Get the dominant emotion, distribution and packed per-second timeline for one question
+def get_question_emotion(index):
+    tracker = st.session_state.get("emotion_tracker")
+    if tracker is None:
+        return {"dominant": NO_EMOTION, "distribution": {}, "timeline": b"", "bucket_seconds": 1.0}
+    if tracker.error:
+        st.warning(f"Error in emotion detection: {tracker.error}")
+    return tracker.end_question(index)
 
 if "interviews" not in st.session_state:
     st.session_state.interviews = []
@@ -156,7 +141,7 @@ if "show_form" in st.session_state and st.session_state.show_form:
             st.session_state.show_form = False
             st.session_state.question_index = 0
             # Start background emotion tracking
-            threading.Thread(target=track_emotions_from_webcam, daemon=True).start()
+            start_emotion_tracking()
             st.rerun()
 
 if "current_interview" in st.session_state:
@@ -165,10 +150,21 @@ if "current_interview" in st.session_state:
     st.text(f"Tech Stack: {interview['stack']}")
     st.text(f"Years of Experience: {interview['experience']}")
     
+    # Microphone over WebRTC, so recording works for remote browsers too
+    microphone = webrtc_streamer(
+        key="microphone",
+        audio_processor_factory=AnswerAudioProcessor,
+        rtc_configuration={"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]},
+        async_processing=True,
+        media_stream_constraints={"video": False, "audio": True}
+    )
+    audio_processor = getattr(microphone, "audio_processor", None)
+
     index = st.session_state.question_index
     if index < len(interview["questions"]):
         st.subheader(f"Question #{index + 1}")
         st.write(interview["questions"][index])
+        start_question_emotion(index)
 
         # Show processed answer in the text area for editing
         if "answer_text" in st.session_state:
@@ -178,20 +174,37 @@ if "current_interview" in st.session_state:
 
         answer = st.text_area("Your Answer", key=f"answer_{index}", value=answer)  # User can edit answer
         
+        recording = st.session_state.get("transcriber") is not None
+        if recording:
+            # Show the transcript as it grows, refreshed every second
+            fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+            def live_transcript():
+                transcriber = st.session_state.get("transcriber")
+                if transcriber is not None:
+                    st.caption(f"Listening... {transcriber.text()}")
+            (fragment(run_every=1.0)(live_transcript) if fragment else live_transcript)()
+
         col1, col2 = st.columns([1, 1])
         with col1:
-            if st.button("Record Answer"):
-                st.session_state.answer_text = record_audio()
+            if recording:
+                if st.button("Stop Recording"):
+                    st.session_state.answer_text = stop_recording(audio_processor)
+                    st.rerun()
+            elif st.button("Record Answer", disabled=audio_processor is None):
+                start_recording(audio_processor)
                 st.rerun()
         
         with col2:
             if st.button("Next Question"):
+                if recording:
+                    st.session_state.answer_text = stop_recording(audio_processor)
                 # Ensure answer is saved properly
                 answer = st.session_state.answer_text if "answer_text" in st.session_state else ""
                 st.session_state.answer_text = ""  # Clear the answer text after moving to next question
                 
-                # Get the current dominant emotion (average) after the answer is submitted
-                avg_emotion = get_avg_emotion()
+                # Get the emotions seen while this question was on screen
+                question_emotion = get_question_emotion(index)
+                avg_emotion = question_emotion["dominant"]
 
                 # Submit the answer and get feedback along with the average emotion
                 feedback = process_answer(interview["questions"][index], answer, avg_emotion)
@@ -200,9 +213,13 @@ if "current_interview" in st.session_state:
                     "question": interview["questions"][index],
                     "answer": answer,
                     "feedback": feedback,
-                    "emotion": avg_emotion
+                    "emotion": avg_emotion,
+                    "emotion_distribution": question_emotion["distribution"],
+                    # One byte per bucket (index into emotion.EMOTIONS, 255 = no sample)
+                    "emotion_timeline": question_emotion["timeline"],
+                    "emotion_bucket_seconds": question_emotion["bucket_seconds"]
                 }
-                feedback_collection.insert_one(response_data)
+                feedback_writer.write(response_data)
                 interview["responses"].append(response_data)
                 st.session_state.question_index += 1
                 st.rerun()
@@ -215,6 +232,7 @@ if "current_interview" in st.session_state:
             st.write(f"**Emotion:** {response['emotion']}")
 
         if st.button("Close Interview"):
+            stop_emotion_tracking()
             del st.session_state["current_interview"]
             del st.session_state["question_index"]
             st.rerun()
@@ -0,0 +1,412 @@
+"""
+Offline proctoring benchmark.
+
+Replays recorded clips through ``VideoTransformer.transform`` with
+proctoring enabled and reports speed and detection results, without a
+webcam, browser or MongoDB:
+
+    python bench_proctoring.py clip.mp4
+    python bench_proctoring.py frames_dir/ --fps 15 --labels clip.labels.json
+    python bench_proctoring.py clip.mp4 --streams 8 --realtime --backend process
+
+A clip is a video file or a directory of image frames (sorted by name).
+Warnings are timed on the clip's own timeline (frame index / fps), so the
+counts do not depend on how fast the host replays it. ``store_face_log`` is
+replaced by an in-memory recorder.
+
+Ground truth (``--labels``) is a JSON file such as::
+
+    {
+      "warnings": {"no_face": 3, "multiple_faces": 0, "eye_gaze": 2},
+      "segments": [
+        {"start": 0, "end": 149, "violation": null},
+        {"start": 150, "end": 240, "violation": "No Face Detected!"}
+      ]
+    }
+
+``segments`` label the overlay message expected on each frame (inclusive
+frame ranges, ``null`` for a clean frame); unlabeled frames are ignored.
+
+``--gaze METHOD`` selects the pupil estimator used by the transformer.
+``--compare-gaze`` additionally runs every estimator on the eye boxes the
+transformer found and reports its time per face and how often its
+looking-away decision agrees with the original contour method.
+
+``--session-start`` reports how long creating a ``VideoTransformer`` takes:
+parsing the cascades per session (the old behaviour), the first session
+on a cold model registry, and later sessions that reuse released cascades.
+
+``--trace-alloc`` measures Python/NumPy heap allocation per frame with
+``tracemalloc`` (peak bytes allocated inside ``transform``); allocations
+made inside OpenCV's C++ code are not visible to it.
+
+``--emotion-compare`` measures the emotion pipeline on frames sampled at
+``EMOTION_SAMPLE_FPS``: *separate* runs DeepFace on the whole frame with
+its own face detector (app1.py next to the proctoring transformer, which
+detects the same face again), *unified* runs it on the face box the
+proctoring Haar pass already found, with DeepFace's detector skipped. It
+needs ``deepface`` installed and reports ms per sample and how often the
+two labels agree.
+
+With ``--streams N`` the clip is replayed by N concurrent transformers;
+with ``--realtime`` each one is paced at the clip's fps, and the report says
+whether every stream kept up — the number of candidates a host can serve.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import proctoring
+from detection import detect_faces
+from emotion import EMOTION_SAMPLE_FPS
+from gaze import GAZE_METHODS, gaze_violation, pupil_positions
+from models import analyze_emotion, load_cascade
+from proctoring import VideoTransformer
+
+STAGES = ("gray", "face_cascade", "eye_cascade", "pupil", "overlay")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class Frame:
+    """Minimal stand-in for ``av.VideoFrame``."""
+
+    def __init__(self, img):
+        self.img = img
+
+    def to_ndarray(self, format="bgr24"):
+        return self.img
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def load_clip(path, max_frames=None):
+    """Return ``(frames, fps)`` for a video file or a directory of images."""
+    frames = []
+    if os.path.isdir(path):
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names[:max_frames]:
+            frames.append(cv2.imread(os.path.join(path, name)))
+        return frames, None
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"Could not open {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or None
+    while max_frames is None or len(frames) < max_frames:
+        ok, img = cap.read()
+        if not ok:
+            break
+        frames.append(img)
+    cap.release()
+    return frames, fps
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def measure_session_start(sessions=5):
+    """Time transformer construction with and without the model registry (in ms)."""
+    def timed(fn):
+        start = time.perf_counter()
+        fn()
+        return (time.perf_counter() - start) * 1000
+
+    per_session_parse = [timed(lambda: (load_cascade("face"), load_cascade("eye"))) for _ in range(sessions)]
+    transformers = []
+    cold = timed(lambda: transformers.append(VideoTransformer(backend="thread")))
+    transformers.pop().on_ended()
+    warm = []
+    for _ in range(sessions):
+        warm.append(timed(lambda: transformers.append(VideoTransformer(backend="thread"))))
+        transformers.pop().on_ended()
+    return {
+        "parse_per_session_ms": float(np.median(per_session_parse)),
+        "registry_cold_ms": cold,
+        "registry_warm_ms": float(np.median(warm)),
+    }
+
+
+def compare_gaze(transformer, results):
+    """Run every pupil estimator on the eyes of the last detection and record time and decision."""
+    if len(transformer.faces) != 1 or len(transformer.eyes) < 2 or "eye_cascade" not in transformer.timer.times:
+        return
+    fx, fy, fw, fh = transformer.faces[0]
+    face_roi = transformer.buffers.gray[fy:fy + fh, fx:fx + fw]
+    for method in GAZE_METHODS:
+        start = time.perf_counter()
+        violation = gaze_violation(pupil_positions(face_roi, transformer.eyes, method))
+        results[method].append((time.perf_counter() - start, violation))
+
+
+def compare_emotion(frames, fps, rate=EMOTION_SAMPLE_FPS):
+    """Time separate vs unified emotion analysis on the frames an ``EmotionTracker`` would sample."""
+    face_cascade = load_cascade("face")
+    step = max(1, int(round(fps / rate)))
+    # The first call builds the DeepFace model; keep it out of the timings.
+    analyze_emotion(frames[0])
+    separate, unified, agree = [], [], []
+    for img in frames[::step]:
+        start = time.perf_counter()
+        faces = detect_faces(face_cascade, cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+        detect = time.perf_counter() - start
+        if len(faces) != 1:
+            continue
+        start = time.perf_counter()
+        full = analyze_emotion(img)[0]["dominant_emotion"]
+        separate.append(detect + time.perf_counter() - start)
+        fx, fy, fw, fh = faces[0]
+        start = time.perf_counter()
+        crop = analyze_emotion(img[fy:fy + fh, fx:fx + fw].copy(), detector_backend="skip")[0]["dominant_emotion"]
+        # The Haar pass is shared with proctoring, so only the classification is extra.
+        unified.append(time.perf_counter() - start)
+        agree.append(full == crop)
+    return {
+        "samples": len(separate),
+        "separate_ms": float(np.mean(separate)) * 1000 if separate else 0.0,
+        "unified_ms": float(np.mean(unified)) * 1000 if unified else 0.0,
+        "agreement": float(np.mean(agree)) if agree else 0.0,
+    }
+
+
+def replay(frames, fps, backend, realtime=False, trace_alloc=False, gaze_method=None, gaze_results=None):
+    """Run one transformer over the clip and return its measurements."""
+    clock = SimulatedClock()
+    transformer = VideoTransformer(backend=backend, clock=clock)
+    if gaze_method:
+        transformer.gaze_method = gaze_method
+    transformer.proctoring_enabled = True
+    transformer.student_id = "bench"
+
+    latencies = []
+    stage_times = {stage: [] for stage in STAGES}
+    messages = []
+    allocations = []
+    period = 1.0 / fps
+    started = time.perf_counter()
+    for index, img in enumerate(frames):
+        clock.now = index * period
+        if realtime:
+            delay = started + index * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        frame = Frame(img.copy())
+        if trace_alloc:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        transformer.transform(frame)
+        latencies.append(time.perf_counter() - start)
+        if trace_alloc:
+            _, peak = tracemalloc.get_traced_memory()
+            allocations.append(peak - before)
+        for stage in STAGES:
+            stage_times[stage].append(transformer.timer.times.get(stage, 0.0))
+        messages.append(transformer.violation_message)
+        if gaze_results is not None:
+            compare_gaze(transformer, gaze_results)
+    elapsed = time.perf_counter() - started
+    transformer.on_ended()
+    return {
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "stage_times": stage_times,
+        "messages": messages,
+        "allocations": allocations,
+        "warnings": {
+            "no_face": transformer.no_face_warning_count,
+            "multiple_faces": transformer.multiple_face_warning_count,
+            "eye_gaze": transformer.eye_gaze_warning_count,
+        },
+        "dropped": transformer.slot.dropped if transformer.slot is not None else 0,
+    }
+
+
+def compare_labels(messages, labels):
+    """Per-frame agreement between the shown overlay messages and labeled segments."""
+    expected = {}
+    for segment in labels.get("segments", []):
+        for index in range(segment["start"], segment["end"] + 1):
+            expected[index] = segment["violation"]
+    labeled = [i for i in expected if i < len(messages)]
+    if not labeled:
+        return None
+    agree = sum(1 for i in labeled if messages[i] == expected[i])
+    missed = sum(1 for i in labeled if expected[i] and messages[i] is None)
+    false_alarms = sum(1 for i in labeled if expected[i] is None and messages[i])
+    return {
+        "labeled_frames": len(labeled),
+        "agreement": agree / len(labeled),
+        "missed_frames": missed,
+        "false_alarm_frames": false_alarms,
+    }
+
+
+def summarize(runs, fps, realtime):
+    latencies = [v for run in runs for v in run["latencies"]]
+    frames = sum(len(run["latencies"]) for run in runs)
+    wall = max(run["elapsed"] for run in runs)
+    report = {
+        "streams": len(runs),
+        "frames": frames,
+        "fps": frames / wall if wall else 0.0,
+        "latency_ms": {q: percentile(latencies, q) * 1000 for q in (50, 95, 99)},
+        "stage_ms": {
+            stage: {
+                "mean": float(np.mean([v for run in runs for v in run["stage_times"][stage]])) * 1000,
+                "p95": percentile([v for run in runs for v in run["stage_times"][stage]], 95) * 1000,
+            }
+            for stage in STAGES
+        },
+        "warnings": runs[0]["warnings"],
+        "dropped_frames": sum(run["dropped"] for run in runs),
+    }
+    allocations = [v for run in runs for v in run["allocations"][1:]]  # skip buffer setup
+    if allocations:
+        report["alloc_kb_per_frame"] = {
+            "mean": float(np.mean(allocations)) / 1024,
+            "p95": percentile(allocations, 95) / 1024,
+        }
+    if realtime:
+        # A stream keeps up if it replays at (almost) the clip rate and a
+        # typical frame is processed within one frame period.
+        per_stream_fps = [len(run["latencies"]) / run["elapsed"] for run in runs]
+        report["min_stream_fps"] = min(per_stream_fps)
+        report["kept_up"] = (min(per_stream_fps) >= 0.95 * fps
+                             and report["latency_ms"][95] <= 1000 / fps)
+    return report
+
+
+def summarize_gaze(results):
+    reference = [violation for _, violation in results["contour"]]
+    summary = {}
+    for method, samples in results.items():
+        if not samples:
+            continue
+        summary[method] = {
+            "us_per_face": float(np.mean([t for t, _ in samples])) * 1e6,
+            "agreement": float(np.mean([v == r for (_, v), r in zip(samples, reference)])),
+            "violation_rate": float(np.mean([v for _, v in samples])),
+        }
+    return summary
+
+
+def print_report(report):
+    print(f"streams: {report['streams']}  frames: {report['frames']}  fps: {report['fps']:.1f}")
+    latency = report["latency_ms"]
+    print(f"latency ms  p50 {latency[50]:.2f}  p95 {latency[95]:.2f}  p99 {latency[99]:.2f}")
+    for stage, times in report["stage_ms"].items():
+        print(f"  {stage:<13} mean {times['mean']:.2f} ms  p95 {times['p95']:.2f} ms")
+    print(f"warnings: {report['warnings']}  logged violations: {report['logged']}")
+    if "alloc_kb_per_frame" in report:
+        alloc = report["alloc_kb_per_frame"]
+        print(f"heap allocation per frame: mean {alloc['mean']:.1f} KB  p95 {alloc['p95']:.1f} KB")
+    if report["dropped_frames"]:
+        print(f"dropped frames (analysis busy): {report['dropped_frames']}")
+    if "session_start" in report:
+        start = report["session_start"]
+        print(f"session start: parse per session {start['parse_per_session_ms']:.1f} ms  "
+              f"registry cold {start['registry_cold_ms']:.1f} ms  warm {start['registry_warm_ms']:.2f} ms")
+    for method, gaze in report.get("gaze", {}).items():
+        print(f"gaze {method:<10} {gaze['us_per_face']:.0f} us/face  agreement with contour "
+              f"{gaze['agreement']:.1%}  violation rate {gaze['violation_rate']:.1%}")
+    if "emotion" in report:
+        emotion = report["emotion"]
+        print(f"emotion over {emotion['samples']} samples: separate {emotion['separate_ms']:.1f} ms  "
+              f"unified {emotion['unified_ms']:.1f} ms  label agreement {emotion['agreement']:.1%}")
+    if "kept_up" in report:
+        print(f"min stream fps: {report['min_stream_fps']:.1f}  kept up: {report['kept_up']}")
+    if "ground_truth" in report:
+        truth = report["ground_truth"]
+        print(f"expected warnings: {truth['expected_warnings']}  diff: {truth['warning_diff']}")
+        if truth["frames"]:
+            frames = truth["frames"]
+            print(f"frame agreement: {frames['agreement']:.1%} over {frames['labeled_frames']} labeled frames "
+                  f"(missed {frames['missed_frames']}, false alarms {frames['false_alarm_frames']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("clip", help="video file or directory of frames")
+    parser.add_argument("--fps", type=float, help="clip frame rate (default: from the file, else 30)")
+    parser.add_argument("--labels", help="ground-truth JSON")
+    parser.add_argument("--max-frames", type=int)
+    parser.add_argument("--backend", choices=("thread", "process"), default=proctoring.PROCTOR_BACKEND)
+    parser.add_argument("--streams", type=int, default=1, help="concurrent transformers")
+    parser.add_argument("--realtime", action="store_true", help="pace each stream at the clip fps")
+    parser.add_argument("--gaze", choices=GAZE_METHODS, help="pupil estimator for the transformer")
+    parser.add_argument("--compare-gaze", action="store_true", help="benchmark all pupil estimators")
+    parser.add_argument("--emotion-compare", action="store_true",
+                        help="compare separate vs unified emotion analysis (needs deepface)")
+    parser.add_argument("--session-start", action="store_true", help="measure transformer creation time")
+    parser.add_argument("--trace-alloc", action="store_true", help="measure heap allocation per frame")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    frames, clip_fps = load_clip(args.clip, args.max_frames)
+    if not frames:
+        raise SystemExit(f"No frames in {args.clip}")
+    fps = args.fps or clip_fps or 30.0
+
+    logged = []
+    proctoring.store_face_log = lambda student_id, message: logged.append(message)
+
+    # Measured first, while the model registry is still cold.
+    session_start = measure_session_start() if args.session_start else None
+
+    runs = [None] * args.streams
+    if args.trace_alloc:
+        tracemalloc.start()
+
+    gaze_results = {method: [] for method in GAZE_METHODS} if args.compare_gaze else None
+
+    def run_stream(i):
+        runs[i] = replay(frames, fps, args.backend, args.realtime, args.trace_alloc, args.gaze,
+                         gaze_results if i == 0 else None)
+
+    threads = [threading.Thread(target=run_stream, args=(i,)) for i in range(args.streams)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = summarize(runs, fps, args.realtime)
+    report["logged"] = len(logged)
+    if session_start is not None:
+        report["session_start"] = session_start
+    if gaze_results is not None:
+        report["gaze"] = summarize_gaze(gaze_results)
+    if args.emotion_compare:
+        report["emotion"] = compare_emotion(frames, fps)
+    if args.labels:
+        with open(args.labels, encoding="utf-8") as f:
+            labels = json.load(f)
+        expected = labels.get("warnings", {})
+        report["ground_truth"] = {
+            "expected_warnings": expected,
+            "warning_diff": {k: report["warnings"][k] - expected[k] for k in expected},
+            "frames": compare_labels(runs[0]["messages"], labels),
+        }
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
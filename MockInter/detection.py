@@ -0,0 +1,237 @@
+"""
+Face and eye detection primitives for proctoring.
+
+Kept free of Streamlit and webrtc imports so the same code runs inside the
+video callback and in offline tools.
+
+Face detection runs on a downscaled grayscale frame (``DETECTION_WIDTH``
+pixels wide) and the boxes are scaled back to full-frame coordinates.
+``DetectionScheduler`` decides which frames run the cascades at all: the
+interval between detections grows while detection is expensive and shrinks
+again when it gets cheap, and the boxes of the last detection are reused on
+the frames in between.
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from gaze import gaze_violation, pupil_positions
+
+DETECTION_WIDTH = int(os.getenv("PROCTOR_DETECTION_WIDTH", "320"))
+# Average cascade time per frame we aim for, in seconds.
+FRAME_BUDGET = float(os.getenv("PROCTOR_FRAME_BUDGET_MS", "8")) / 1000
+MAX_DETECTION_INTERVAL = int(os.getenv("PROCTOR_MAX_DETECTION_INTERVAL", "6"))
+GAZE_METHOD = os.getenv("PROCTOR_GAZE_METHOD", "contour")
+
+
+class StageTimer:
+    """Accumulate wall time (seconds) per pipeline stage for the current frame."""
+
+    def __init__(self):
+        self.times = {}
+
+    def reset(self):
+        self.times = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0.0) + time.perf_counter() - start
+
+
+class _NullTimer:
+    @contextmanager
+    def stage(self, name):
+        yield
+
+
+NULL_TIMER = _NullTimer()
+
+
+class FrameBuffers:
+    """Preallocated work arrays for one stream, rebuilt only when the resolution changes.
+
+    Holds the grayscale frame, the red tint used by the violation overlay,
+    one rendered text layer per violation message, and a small LRU of
+    scratch arrays (downscaled frames, equalized/thresholded eye ROIs) keyed
+    by shape, so steady-state frames do not allocate image-sized arrays.
+    """
+
+    TINT = (0, 0, 255)
+
+    def __init__(self, max_scratch=32):
+        self.max_scratch = max_scratch
+        self.shape = None
+        self.gray = None
+        self.tint = None
+        self._text_layers = {}
+        self._scratch = OrderedDict()
+
+    def ensure(self, shape):
+        """Make sure the buffers match a ``(height, width, 3)`` frame."""
+        if shape == self.shape:
+            return
+        h, w = shape[:2]
+        self.shape = shape
+        self.gray = np.empty((h, w), dtype=np.uint8)
+        self.tint = np.empty((h, w, 3), dtype=np.uint8)
+        self.tint[:] = self.TINT
+        self._text_layers = {}
+        self._scratch = OrderedDict()
+
+    def scratch(self, shape, slot=0):
+        """Return a reusable uint8 array of ``shape``; contents are undefined."""
+        key = (shape, slot)
+        buf = self._scratch.get(key)
+        if buf is None:
+            buf = self._scratch[key] = np.empty(shape, dtype=np.uint8)
+            if len(self._scratch) > self.max_scratch:
+                self._scratch.popitem(last=False)
+        else:
+            self._scratch.move_to_end(key)
+        return buf
+
+    def text_layer(self, message):
+        """Return ``message`` rendered in white, centered, on a black frame-sized layer."""
+        layer = self._text_layers.get(message)
+        if layer is None:
+            h, w = self.shape[:2]
+            layer = np.zeros((h, w, 3), dtype=np.uint8)
+            font = cv2.FONT_HERSHEY_SIMPLEX
+            font_scale = w / 800
+            thickness = max(2, int(w / 400))
+            text_size, _ = cv2.getTextSize(message, font, font_scale, thickness)
+            text_x = (w - text_size[0]) // 2
+            text_y = (h + text_size[1]) // 2
+            cv2.putText(layer, message, (text_x, text_y), font, font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
+            self._text_layers[message] = layer
+        return layer
+
+
+def downscale(gray, width=DETECTION_WIDTH, buffers=None):
+    """Return ``(small, scale)`` where ``small`` is ``gray`` resized to at most ``width`` pixels wide."""
+    h, w = gray.shape[:2]
+    if w <= width:
+        return gray, 1.0
+    scale = width / w
+    size = (width, max(1, round(h * scale)))
+    dst = buffers.scratch((size[1], size[0]), "small") if buffers is not None else None
+    small = cv2.resize(gray, size, dst=dst, interpolation=cv2.INTER_AREA)
+    return small, scale
+
+
+def detect_faces(face_cascade, gray, width=DETECTION_WIDTH, scale_factor=1.1, min_neighbors=5, buffers=None):
+    """Detect faces on a downscaled copy of ``gray`` and return full-resolution boxes."""
+    small, scale = downscale(gray, width, buffers)
+    faces = face_cascade.detectMultiScale(small, scaleFactor=scale_factor, minNeighbors=min_neighbors)
+    return [tuple(int(round(v / scale)) for v in face) for face in faces]
+
+
+def redetect_face(face_cascade, gray, box, margin=0.3, width=DETECTION_WIDTH, buffers=None):
+    """Look for faces only in a window around ``box`` (the previous detection).
+
+    Returns boxes in full-frame coordinates. Much cheaper than a full-frame
+    scan, but blind to faces that appear elsewhere.
+    """
+    x, y, w, h = box
+    frame_h, frame_w = gray.shape[:2]
+    x0, y0 = max(0, int(x - margin * w)), max(0, int(y - margin * h))
+    x1, y1 = min(frame_w, int(x + w + margin * w)), min(frame_h, int(y + h + margin * h))
+    roi = gray[y0:y1, x0:x1]
+    if roi.size == 0:
+        return []
+    # Keep the ROI at the same pixel density as a full-frame detection.
+    roi_width = max(1, int(width * roi.shape[1] / frame_w))
+    return [(fx + x0, fy + y0, fw, fh)
+            for (fx, fy, fw, fh) in detect_faces(face_cascade, roi, roi_width, buffers=buffers)]
+
+
+def check_eye_gaze(eye_cascade, face_roi_gray, timer=NULL_TIMER, buffers=None, gaze_method=GAZE_METHOD):
+    """Detect eyes in a face ROI and decide whether the candidate looks away.
+
+    Returns ``(eyes, eye_violation)`` with eye boxes relative to the ROI.
+    Fewer than two eyes, or a pupil in the outer quarter of an eye, count as
+    a violation. ``gaze_method`` selects the pupil estimator (see gaze.py).
+    """
+    with timer.stage("eye_cascade"):
+        eyes = eye_cascade.detectMultiScale(face_roi_gray, scaleFactor=1.1, minNeighbors=5)
+    if len(eyes) < 2:
+        return eyes, True
+    with timer.stage("pupil"):
+        positions = pupil_positions(face_roi_gray, eyes, gaze_method, buffers)
+    return eyes, gaze_violation(positions)
+
+
+def analyze_gray(face_cascade, eye_cascade, gray, prev_faces=(), full_scan=True, timer=NULL_TIMER, buffers=None,
+                 gaze_method=GAZE_METHOD):
+    """Run one detection pass over a grayscale frame.
+
+    Returns ``(faces, eyes, eye_violation)``. When a single face was tracked
+    (``prev_faces``) and no full scan is due, only a window around it is
+    searched; a full-frame scan is the fallback if that does not find
+    exactly one face.
+    """
+    with timer.stage("face_cascade"):
+        faces = None
+        if len(prev_faces) == 1 and not full_scan:
+            faces = redetect_face(face_cascade, gray, prev_faces[0], buffers=buffers)
+            if len(faces) != 1:
+                faces = None
+        if faces is None:
+            faces = detect_faces(face_cascade, gray, buffers=buffers)
+
+    eyes, eye_violation = [], False
+    if len(faces) == 1:
+        (fx, fy, fw, fh) = faces[0]
+        eyes, eye_violation = check_eye_gaze(eye_cascade, gray[fy:fy + fh, fx:fx + fw], timer, buffers, gaze_method)
+    return faces, eyes, eye_violation
+
+
+class DetectionScheduler:
+    """Run the cascades every Nth frame, with N adapted to measured detection cost.
+
+    After each detection the cost is folded into an exponential moving
+    average and N is set so that ``cost / N`` stays within ``frame_budget``.
+    Every ``full_scan_every``-th detection scans the whole frame even when a
+    single face is being tracked, so a second person is still noticed.
+    """
+
+    def __init__(self, frame_budget=FRAME_BUDGET, max_interval=MAX_DETECTION_INTERVAL,
+                 full_scan_every=3, smoothing=0.2):
+        self.frame_budget = frame_budget
+        self.max_interval = max(1, max_interval)
+        self.full_scan_every = full_scan_every
+        self.smoothing = smoothing
+        self.interval = 1
+        self.avg_cost = None
+        self.frames_since_detection = 0
+        self.detections = 0
+
+    def should_detect(self):
+        """Advance by one frame and return True if the cascades should run on it."""
+        self.frames_since_detection += 1
+        if self.frames_since_detection >= self.interval:
+            self.frames_since_detection = 0
+            return True
+        return False
+
+    def needs_full_scan(self):
+        return self.detections % self.full_scan_every == 0
+
+    def record(self, cost):
+        """Record the duration (seconds) of one detection and adapt the interval."""
+        self.detections += 1
+        if self.avg_cost is None:
+            self.avg_cost = cost
+        else:
+            self.avg_cost += self.smoothing * (cost - self.avg_cost)
+        wanted = math.ceil(self.avg_cost / self.frame_budget) if self.frame_budget > 0 else 1
+        self.interval = min(self.max_interval, max(1, wanted))
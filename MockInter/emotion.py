@@ -0,0 +1,287 @@
+"""
+Throttled emotion sampling with bounded per-session aggregation.
+
+DeepFace is far too slow to run on every webcam frame, and a global list of
+every label ever seen grows forever and mixes users. Instead:
+
+* ``EmotionAggregate`` keeps the last ``window`` labels in a ring buffer
+  together with running counts, so the dominant emotion and the full
+  distribution cost O(number of emotion classes) regardless of history.
+* ``EmotionTimeline`` keeps per-second counts for the whole interview in
+  one flat array, so each answer can be stored with the emotions seen
+  while *that* question was on screen: its distribution plus a packed
+  timeline of one byte per second.
+* ``EmotionTracker`` (one per Streamlit session) submits at most ``rate``
+  frames per second - and never more than one at a time - to a shared
+  worker process that runs DeepFace. Frames come either from its own
+  webcam thread (``start``) or, in the unified pipeline, from
+  ``VideoTransformer``, which offers the face it has already detected and
+  cropped so DeepFace can skip its own face detection.
+
+``EMOTION_SAMPLE_FPS`` sets the default rate (2).
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from array import array
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMOTIONS = ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")
+EMOTION_SAMPLE_FPS = float(os.getenv("EMOTION_SAMPLE_FPS", "2"))
+NO_EMOTION = "No emotions detected"
+EMOTION_INDEX = {label: i for i, label in enumerate(EMOTIONS)}
+# Timeline byte for a bucket without any sample.
+NO_SAMPLE = 255
+
+
+class EmotionAggregate:
+    """Counts over the most recent ``window`` emotion labels."""
+
+    def __init__(self, window=600):
+        self.labels = deque(maxlen=window)
+        self.counts = Counter()
+
+    def add(self, label):
+        if len(self.labels) == self.labels.maxlen:
+            self.counts[self.labels[0]] -= 1
+        self.labels.append(label)
+        self.counts[label] += 1
+
+    def dominant(self):
+        """Most frequent label in the window, or ``NO_EMOTION``."""
+        if not self.labels:
+            return NO_EMOTION
+        return max(self.counts, key=self.counts.get)
+
+    def distribution(self):
+        """Share of each label in the window."""
+        total = len(self.labels)
+        return {label: count / total for label, count in self.counts.items() if count} if total else {}
+
+
+class EmotionTimeline:
+    """Emotion counts per ``bucket_seconds`` for one interview.
+
+    Counts live in a flat ``array('H')`` of ``len(EMOTIONS)`` slots per
+    bucket, starting at ``start`` (a ``time.time()`` value).
+    """
+
+    def __init__(self, bucket_seconds=1.0, start=None):
+        self.bucket_seconds = bucket_seconds
+        self.start = time.time() if start is None else start
+        self.counts = array("H")
+
+    def bucket(self, t):
+        return max(0, int((t - self.start) / self.bucket_seconds))
+
+    def add(self, label, t=None):
+        index = EMOTION_INDEX.get(label)
+        if index is None:
+            return
+        bucket = self.bucket(time.time() if t is None else t)
+        missing = (bucket + 1) * len(EMOTIONS) - len(self.counts)
+        if missing > 0:
+            self.counts.extend(array("H", bytes(2 * missing)))
+        slot = bucket * len(EMOTIONS) + index
+        if self.counts[slot] < 0xFFFF:
+            self.counts[slot] += 1
+
+    def summarize(self, start, end):
+        """Emotions seen between two ``time.time()`` values.
+
+        Returns ``{"dominant", "distribution", "timeline", "bucket_seconds"}``
+        where ``timeline`` packs one byte per bucket: the index of that
+        bucket's dominant emotion in ``EMOTIONS``, or ``NO_SAMPLE``.
+        """
+        grid = np.frombuffer(self.counts, dtype=np.uint16).reshape(-1, len(EMOTIONS))
+        rows = grid[self.bucket(start):self.bucket(end) + 1]
+        totals = rows.sum(axis=0)
+        codes = np.where(rows.any(axis=1), rows.argmax(axis=1), NO_SAMPLE).astype(np.uint8)
+        # Buckets after the last sample are not in the array yet.
+        codes = np.concatenate([codes, np.full(self.bucket(end) - self.bucket(start) + 1 - len(codes),
+                                               NO_SAMPLE, dtype=np.uint8)])
+        total = int(totals.sum())
+        return {
+            "dominant": EMOTIONS[int(totals.argmax())] if total else NO_EMOTION,
+            "distribution": {EMOTIONS[i]: int(c) / total for i, c in enumerate(totals) if c},
+            "timeline": codes.tobytes(),
+            "bucket_seconds": self.bucket_seconds,
+        }
+
+
+def unpack_timeline(timeline):
+    """Decode a packed timeline into one label (or None) per bucket."""
+    return [EMOTIONS[code] if code != NO_SAMPLE else None for code in bytes(timeline)]
+
+
+# ---------------------------
+# Analysis worker process
+# ---------------------------
+def _init_worker():
+    from models import warm_up
+
+    warm_up(sessions=0, emotion=True)
+
+
+def _worker_ready():
+    return True
+
+
+def classify_emotion(frame, face_only=False):
+    """Worker entry point: dominant emotion of one BGR frame (or of an already cropped face)."""
+    from models import analyze_emotion
+
+    kwargs = {"detector_backend": "skip"} if face_only else {}
+    return analyze_emotion(frame, **kwargs)[0]["dominant_emotion"]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_emotion_executor():
+    """Return the process-wide DeepFace worker, starting (and warming) it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=_init_worker)
+                atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+    return _executor
+
+
+def warm_up_emotion_worker():
+    """Spawn the worker now so it builds the model before the first frame; returns the ready future.
+
+    ``ProcessPoolExecutor`` only starts its process on the first submit.
+    """
+    return get_emotion_executor().submit(_worker_ready)
+
+
+def _replace_broken_executor(executor):
+    """Drop ``executor`` if it is still the shared one, so the next use starts a fresh worker."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ---------------------------
+# Per-session tracker
+# ---------------------------
+class EmotionTracker:
+    """Sample a webcam at a fixed rate and aggregate the detected emotions."""
+
+    def __init__(self, rate=EMOTION_SAMPLE_FPS, window=600):
+        self.rate = rate
+        self.aggregate = EmotionAggregate(window)
+        self.timeline = EmotionTimeline()
+        self._question_start = {}
+        self.error = None
+        self._lock = threading.Lock()
+        self._in_flight = False
+        self._last_submit = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, source=0):
+        """Start reading ``source`` (a cv2.VideoCapture index or path) in a daemon thread."""
+        self._thread = threading.Thread(target=self._capture, args=(source,), name="emotion-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def ready(self):
+        """Cheap pre-check: would ``offer`` accept a frame right now?"""
+        return not self._in_flight and time.monotonic() - self._last_submit >= 1.0 / self.rate
+
+    def offer(self, frame, face_only=False):
+        """Submit ``frame`` for analysis if the rate allows and nothing is in flight.
+
+        ``face_only`` marks a frame that is already a cropped face. Returns
+        True if the frame was submitted.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._in_flight or now - self._last_submit < 1.0 / self.rate:
+                return False
+            self._in_flight = True
+            self._last_submit = now
+        captured_at = time.time()
+        executor = get_emotion_executor()
+        try:
+            future = executor.submit(classify_emotion, frame, face_only)
+        except Exception as e:
+            # A dead worker (BrokenProcessPool) must not leave the session stuck "in flight".
+            logger.exception("Emotion worker unavailable, restarting it")
+            with self._lock:
+                self._in_flight = False
+                self.error = e
+            _replace_broken_executor(executor)
+            return False
+        future.add_done_callback(lambda f: self._on_result(f, captured_at, executor))
+        return True
+
+    def start_question(self, index):
+        """Mark the moment question ``index`` was first shown."""
+        self._question_start.setdefault(index, time.time())
+
+    def end_question(self, index):
+        """Summarize the emotions seen while question ``index`` was on screen."""
+        start = self._question_start.get(index, self.timeline.start)
+        with self._lock:
+            return self.timeline.summarize(start, time.time())
+
+    def dominant(self):
+        with self._lock:
+            return self.aggregate.dominant()
+
+    def distribution(self):
+        with self._lock:
+            return self.aggregate.distribution()
+
+    def _on_result(self, future, captured_at, executor):
+        broken = False
+        with self._lock:
+            self._in_flight = False
+            try:
+                label = future.result()
+            except Exception as e:
+                self.error = e
+                broken = isinstance(e, BrokenProcessPool)
+            else:
+                self.aggregate.add(label)
+                self.timeline.add(label, captured_at)
+        if broken:
+            logger.warning("Emotion worker died, starting a new one for the next sample")
+            _replace_broken_executor(executor)
+
+    def _capture(self, source):
+        import cv2
+
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            self.error = RuntimeError("Could not access the webcam")
+            return
+        try:
+            while not self._stop.is_set():
+                # Keep reading so the capture buffer stays fresh; only some frames are analysed.
+                ret, frame = cap.read()
+                if not ret:
+                    self.error = RuntimeError("Failed to grab frame from webcam")
+                    break
+                self.offer(frame)
+        finally:
+            cap.release()
@@ -0,0 +1,118 @@
+"""
+Background evaluation of interview answers.
+
+Grading an answer is a full Gemini round-trip. Instead of blocking the
+"Next Question" click on it, the answer is handed to ``AnswerEvaluator``,
+which grades it on a small thread pool and persists the graded response
+through the feedback ``BufferedWriter`` (flushed by the worker) once the
+feedback arrives.
+
+Every submission has a key derived from the interview, the question index
+and the answer text (``evaluation_key``). Submitting a key that is pending
+or done returns the existing evaluation, so a rerun that repeats the click
+does not grade or store the answer twice; the key is also the stored
+document's ``_id``. Failed evaluations are kept as failed and are retried
+by the next submission of the same key.
+
+The evaluator is shared by every session of the process, so finished
+evaluations are not kept forever: the summary page ``forget``s an answer's
+evaluation once it has copied the feedback into the interview, and beyond
+``EVALUATION_MAX_TRACKED`` (1000) tracked evaluations the oldest finished
+ones are dropped, which covers sessions that never reach the summary.
+
+``EVALUATION_WORKERS`` sets the pool size (4) and ``EVALUATION_TIMEOUT`` how
+long the summary page waits for outstanding evaluations (20 s).
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+EVALUATION_WORKERS = int(os.getenv("EVALUATION_WORKERS", "4"))
+EVALUATION_TIMEOUT = float(os.getenv("EVALUATION_TIMEOUT", "20"))
+EVALUATION_MAX_TRACKED = int(os.getenv("EVALUATION_MAX_TRACKED", "1000"))
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def evaluation_key(interview_id, index, answer):
+    """Stable id of one answer to one question of one interview."""
+    return hashlib.sha256(f"{interview_id}\0{index}\0{answer}".encode("utf-8")).hexdigest()
+
+
+class AnswerEvaluator:
+    """Grade answers with ``evaluate(question, answer)`` off the Streamlit script thread."""
+
+    def __init__(self, evaluate, writer, max_workers=EVALUATION_WORKERS, max_tracked=EVALUATION_MAX_TRACKED):
+        self.evaluate = evaluate
+        self.writer = writer
+        self.max_tracked = max_tracked
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="answer-eval")
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, question, answer, record):
+        """Queue ``record`` (the response document) for grading unless ``key`` is already pending or done."""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                return future
+            future = self._executor.submit(self._run, key, question, answer, dict(record))
+            self._futures[key] = future
+            self._futures.move_to_end(key)
+            self._evict_finished()
+            return future
+
+    def _evict_finished(self):
+        """Drop the oldest finished evaluations beyond ``max_tracked`` (pending ones are kept)."""
+        excess = len(self._futures) - self.max_tracked
+        finished = (key for key, future in self._futures.items() if future.done())
+        for key in [key for key, _ in zip(finished, range(max(0, excess)))]:
+            del self._futures[key]
+
+    def status(self, key):
+        """``PENDING``, ``DONE``, ``FAILED`` or None for an unknown key."""
+        future = self._futures.get(key)
+        if future is None:
+            return None
+        if not future.done():
+            return PENDING
+        return FAILED if future.exception() is not None else DONE
+
+    def result(self, key):
+        """The feedback text for ``key``, or None while it is not (successfully) done."""
+        return self._futures[key].result() if self.status(key) == DONE else None
+
+    def collect(self, keys, timeout=EVALUATION_TIMEOUT):
+        """Wait up to ``timeout`` seconds for the evaluations of ``keys``; returns the keys still pending."""
+        futures = {self._futures[key]: key for key in keys if key in self._futures}
+        _, not_done = wait(futures, timeout=timeout)
+        return [futures[future] for future in not_done]
+
+    def forget(self, keys):
+        """Drop finished evaluations once their session no longer needs them."""
+        with self._lock:
+            for key in keys:
+                future = self._futures.get(key)
+                if future is not None and future.done():
+                    del self._futures[key]
+
+    def _run(self, key, question, answer, record):
+        start = time.perf_counter()
+        try:
+            feedback = self.evaluate(question, answer)
+        except Exception:
+            logger.exception("Evaluation %s failed", key[:12])
+            raise
+        record.update({"_id": key, "feedback": feedback, "evaluation_seconds": time.perf_counter() - start})
+        self.writer.write(record)
+        # This runs on an evaluation worker, so the feedback can be persisted right away.
+        self.writer.flush()
+        return feedback
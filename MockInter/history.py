@@ -0,0 +1,133 @@
+"""
+Persistent interview history.
+
+Every interview is stored as one document in ``interviews`` with its
+``interview_id`` as ``_id``: metadata (user, role, stack, experience,
+pipeline options, start time), the questions, one compact entry per answer
+(answer, feedback, score and rubric, dominant emotion), the proctoring
+warning counts and a small ``summary`` (answered count, average score) for
+list views. ``InterviewHistory.save`` upserts the document, so it can be
+called whenever the interview changes.
+
+The list of previous interviews is read newest first through
+``InterviewHistory.page``, which is keyset-paginated on
+``(created_at, _id)`` over the ``(username, created_at, _id)`` index and
+projects only the list fields; the questions and answers of one interview
+are loaded by ``get`` when the student opens it. A student with hundreds of
+interviews therefore gets the first page from one index range scan.
+"""
+import logging
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+
+from common.db import get_collection
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 10
+LIST_FIELDS = {"role": 1, "stack": 1, "experience": 1, "created_at": 1, "completed_at": 1, "summary": 1}
+# Per-answer fields kept in the history document (the emotion timeline stays in the feedback records).
+ANSWER_FIELDS = ("question", "answer", "feedback", "score", "rubric", "emotion")
+
+
+def new_interview_time():
+    """Start time stored with a new interview (MongoDB keeps millisecond precision)."""
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000, tzinfo=None)
+
+
+def local_time(stored):
+    """A stored (naive UTC) time in the server's local timezone, for display."""
+    return stored.replace(tzinfo=timezone.utc).astimezone()
+
+
+def compact_answers(responses):
+    return [{field: response[field] for field in ANSWER_FIELDS if response.get(field) is not None}
+            for response in responses]
+
+
+def summarize(answers):
+    scores = [answer["score"] for answer in answers if "score" in answer]
+    return {
+        "answered": len(answers),
+        "evaluated": sum("feedback" in answer for answer in answers),
+        "average_score": round(sum(scores) / len(scores), 1) if scores else None,
+    }
+
+
+class InterviewHistory:
+    """Store interviews one document each and read them back page by page."""
+
+    def __init__(self, db_name, collection_name="interviews", page_size=PAGE_SIZE):
+        self.db_name = db_name
+        self.collection_name = collection_name
+        self.page_size = page_size
+        self._indexes_ready = False
+
+    def _interviews(self):
+        return get_collection(self.db_name, self.collection_name)
+
+    def _ensure_indexes(self):
+        if not self._indexes_ready:
+            self._interviews().create_index(
+                [("username", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
+            self._indexes_ready = True
+
+    def save(self, interview, proctoring=None, completed=False):
+        """Upsert ``interview`` (the session's interview dict); returns False if MongoDB is unavailable.
+
+        ``proctoring`` is a dict of warning counts.
+        """
+        answers = compact_answers(interview["responses"])
+        fields = {
+            "username": interview["username"],
+            "role": interview["role"],
+            "stack": interview["stack"],
+            "experience": interview["experience"],
+            "created_at": interview["created_at"],
+            "pipeline": interview["pipeline"],
+            "questions": interview["questions"],
+            "answers": answers,
+            "summary": summarize(answers),
+        }
+        if proctoring is not None:
+            fields["proctoring"] = proctoring
+        update = {"$set": fields}
+        if completed:
+            # $min keeps the first completion time across the later saves of the summary page.
+            update["$min"] = {"completed_at": datetime.now(timezone.utc).replace(tzinfo=None)}
+        try:
+            self._ensure_indexes()
+            self._interviews().update_one({"_id": interview["interview_id"]}, update, upsert=True)
+            return True
+        except PyMongoError as e:
+            logger.warning("Could not save interview %s: %s", interview["interview_id"], e)
+            return False
+
+    def page(self, username, after=None, limit=None):
+        """One page of the user's interviews, newest first, with the list fields only.
+
+        ``after`` is the cursor returned with the previous page. Returns
+        ``(interviews, cursor)``; the cursor is None on the last page.
+        """
+        limit = limit or self.page_size
+        query = {"username": username}
+        if after is not None:
+            created_at, interview_id = after
+            query["$or"] = [{"created_at": {"$lt": created_at}},
+                            {"created_at": created_at, "_id": {"$lt": interview_id}}]
+        self._ensure_indexes()
+        cursor = (self._interviews().find(query, LIST_FIELDS)
+                  .sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+                  .limit(limit + 1))
+        interviews = list(cursor)
+        if len(interviews) <= limit:
+            return interviews, None
+        last = interviews[limit - 1]
+        return interviews[:limit], (last["created_at"], last["_id"])
+
+    def get(self, username, interview_id):
+        """The full stored interview, or None."""
+        return self._interviews().find_one({"_id": interview_id, "username": username})
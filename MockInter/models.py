@@ -0,0 +1,96 @@
+"""
+Process-wide registry of detection models.
+
+Parsing the Haar cascade XML files takes tens of milliseconds, and DeepFace
+builds its emotion network on the first ``analyze`` call, which stalls that
+frame for seconds. Both are loaded here once per process - ideally at app
+startup through ``warm_up`` - and handed out to sessions:
+
+* Cascades are kept in per-model free lists. ``acquire_cascade`` checks an
+  instance out for the exclusive use of one session (``detectMultiScale`` is
+  not safe to call concurrently on one instance) and ``release_cascade``
+  returns it when the stream ends, so reconnects reuse parsed cascades.
+* The emotion model is shared; ``analyze_emotion`` serialises calls to it.
+
+``load_times`` records how long each model took to load.
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+CASCADE_FILES = {
+    "face": "haarcascade_frontalface_default.xml",
+    "eye": "haarcascade_eye.xml",
+}
+
+load_times = {}
+_free_cascades = {name: [] for name in CASCADE_FILES}
+_cascade_lock = threading.Lock()
+_emotion_lock = threading.Lock()
+_emotion_ready = False
+
+
+def load_cascade(name):
+    """Parse a cascade from disk (no pooling)."""
+    start = time.perf_counter()
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + CASCADE_FILES[name])
+    load_times.setdefault(f"cascade:{name}", time.perf_counter() - start)
+    return cascade
+
+
+def acquire_cascade(name):
+    """Check out a parsed cascade for the exclusive use of one session."""
+    with _cascade_lock:
+        if _free_cascades[name]:
+            return _free_cascades[name].pop()
+    return load_cascade(name)
+
+
+def release_cascade(name, cascade):
+    """Return a cascade obtained from ``acquire_cascade``."""
+    if cascade is not None:
+        with _cascade_lock:
+            _free_cascades[name].append(cascade)
+
+
+def _load_emotion_model():
+    global _emotion_ready
+    if not _emotion_ready:
+        from deepface import DeepFace
+
+        start = time.perf_counter()
+        # A dummy analysis builds the network and runs the first (slow) prediction.
+        DeepFace.analyze(np.zeros((48, 48, 3), dtype=np.uint8), actions=["emotion"],
+                         enforce_detection=False, detector_backend="skip")
+        load_times["emotion"] = time.perf_counter() - start
+        _emotion_ready = True
+
+
+def analyze_emotion(frame, **kwargs):
+    """Thread-safe ``DeepFace.analyze(frame, actions=["emotion"])`` on the shared model."""
+    from deepface import DeepFace
+
+    with _emotion_lock:
+        _load_emotion_model()
+        return DeepFace.analyze(frame, actions=["emotion"], enforce_detection=False, **kwargs)
+
+
+def warm_up(sessions=2, emotion=False):
+    """Load and exercise the models once, before the first session needs them.
+
+    Parses ``sessions`` instances of every cascade into the free lists and,
+    with ``emotion=True``, builds the DeepFace emotion model. Returns
+    ``load_times``.
+    """
+    blank = np.zeros((240, 320), dtype=np.uint8)
+    for name in CASCADE_FILES:
+        cascades = [acquire_cascade(name) for _ in range(sessions)]
+        for cascade in cascades:
+            cascade.detectMultiScale(blank)
+            release_cascade(name, cascade)
+    if emotion:
+        with _emotion_lock:
+            _load_emotion_model()
+    return dict(load_times)
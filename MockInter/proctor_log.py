@@ -0,0 +1,279 @@
+"""
+Asynchronous, batched logging of proctoring violations.
+
+``VideoTransformer.transform`` runs once per video frame, so it must never
+wait on MongoDB. Violations are appended to a bounded in-memory queue
+(``collections.deque`` appends and pops are atomic, so the frame callback
+takes no lock) and a background thread drains it:
+
+* consecutive identical violations of a student are coalesced into one
+  interval document ``{student_id, violation, timestamp, end, count}``;
+* closed intervals are written in batches with unordered ``insert_many``;
+* when MongoDB is unreachable the batch is appended to a local JSONL spill
+  file, which is replayed once writes succeed again. Every interval gets
+  its ``_id`` when it is closed and keeps it in the spill file, so a
+  replay never stores a document twice; after a failed write the logger
+  backs off (up to ``max_backoff`` seconds) before it tries MongoDB again
+  and spills directly in the meantime. On a partial ``insert_many``
+  failure only the documents that were not stored are spilled.
+
+Processes share the spill file. A replay first renames it to a file of
+its own (``<spill>.<pid>.replay``), so two processes never replay the same
+file; replay files left by a process that stopped mid-replay are merged
+back into the spill file when the next writer starts. Unreadable spill
+lines (e.g. cut short by a crash) are logged and skipped, and a failed
+iteration of the writer is logged without stopping the thread.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from common.db import get_collection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPILL_PATH = os.path.join(tempfile.gettempdir(), "mockinter_face_logs.jsonl")
+DUPLICATE_KEY = 11000
+
+
+class ViolationLogger:
+    """Background writer for proctoring violation intervals."""
+
+    def __init__(self, db_name="mock_interviews", collection_name="face_logs", max_queue=10000,
+                 batch_size=200, flush_interval=1.0, coalesce_gap=5.0, spill_path=None, max_backoff=60.0):
+        self.db_name = db_name
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Two events further apart than this start a new interval.
+        self.coalesce_gap = coalesce_gap
+        self.spill_path = spill_path or os.getenv("PROCTOR_SPILL_PATH", DEFAULT_SPILL_PATH)
+        self.max_backoff = max_backoff
+        self.dropped = 0
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._queue = deque(maxlen=max_queue)
+        self._open = {}
+        self._ready = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    # ---------------------------
+    # Producer side (frame callback)
+    # ---------------------------
+    def log(self, student_id, message, timestamp=None):
+        """Queue a violation; never blocks on I/O."""
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1  # the deque discards the oldest event
+        self._queue.append((student_id, message, timestamp or time.time()))
+        if self._thread is None:
+            self._start()
+
+    def queue_depth(self):
+        """Number of events waiting to be drained."""
+        return len(self._queue)
+
+    def _start(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="proctor-log-writer", daemon=True)
+                self._thread.start()
+
+    # ---------------------------
+    # Consumer side (background writer)
+    # ---------------------------
+    def close(self, timeout=5.0):
+        """Drain the queue, close open intervals and stop the writer."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            self._recover_replays()
+        except Exception:
+            logger.exception("Could not recover face log replay files")
+        while not self._stop.wait(self.flush_interval):
+            self._flush(time.time())
+        self._flush(float("inf"))
+
+    def _flush(self, now):
+        try:
+            self._drain(now)
+            self._write_ready()
+        except Exception:
+            # Keep the writer alive: a dead thread would silently drop every later violation.
+            logger.exception("Face log writer failed; continuing")
+
+    def _drain(self, now):
+        """Move queued events into intervals; close intervals that went quiet."""
+        while self._queue:
+            student_id, message, ts = self._queue.popleft()
+            current = self._open.get(student_id)
+            if current and current["violation"] == message and ts - current["_last"] <= self.coalesce_gap:
+                current["_last"] = ts
+                current["count"] += 1
+                continue
+            if current:
+                self._ready.append(self._close_interval(current))
+            self._open[student_id] = {
+                "student_id": student_id,
+                "violation": message,
+                "count": 1,
+                "_first": ts,
+                "_last": ts,
+            }
+        for student_id, current in list(self._open.items()):
+            if now - current["_last"] > self.coalesce_gap:
+                self._ready.append(self._close_interval(current))
+                del self._open[student_id]
+
+    @staticmethod
+    def _close_interval(interval):
+        return {
+            "_id": ObjectId(),
+            "student_id": interval["student_id"],
+            "violation": interval["violation"],
+            "timestamp": datetime.fromtimestamp(interval["_first"]),
+            "end": datetime.fromtimestamp(interval["_last"]),
+            "count": interval["count"],
+        }
+
+    def _write_ready(self):
+        if time.monotonic() < self._retry_at:
+            # MongoDB failed recently: don't block on another server-selection timeout.
+            if self._ready:
+                self._spill(self._ready)
+                self._ready = []
+            return
+        while self._ready:
+            batch, self._ready = self._ready[:self.batch_size], self._ready[self.batch_size:]
+            unwritten = self._insert(batch)
+            if unwritten is None:
+                self._spill(batch + self._ready)
+                self._ready = []
+                self._back_off()
+                return
+            if unwritten:
+                self._spill(unwritten)
+        if os.path.exists(self.spill_path):
+            self._replay_spill()
+
+    def _back_off(self):
+        self._backoff = min(self.max_backoff, max(self.flush_interval, self._backoff * 2))
+        self._retry_at = time.monotonic() + self._backoff
+
+    def _insert(self, batch):
+        """Insert ``batch``; returns the documents that were not stored, or None if MongoDB is unavailable."""
+        try:
+            get_collection(self.db_name, self.collection_name).insert_many(batch, ordered=False)
+            self._backoff = 0.0
+            return []
+        except BulkWriteError as e:
+            # Unordered: everything but the failed documents is stored. A duplicate
+            # key means an earlier (replayed) attempt already stored the document.
+            failed = [error["index"] for error in e.details.get("writeErrors", [])
+                      if error.get("code") != DUPLICATE_KEY]
+            if failed:
+                logger.warning("Could not write %d face log(s), spilling to %s", len(failed), self.spill_path)
+            return [batch[index] for index in failed]
+        except PyMongoError as e:
+            logger.warning("Could not write %d face log(s), spilling to %s: %s", len(batch), self.spill_path, e)
+            return None
+
+    def _spill(self, docs):
+        lines = []
+        for doc in docs:
+            doc = {k: v.isoformat() if isinstance(v, datetime) else str(v) if isinstance(v, ObjectId) else v
+                   for k, v in doc.items()}
+            lines.append(json.dumps(doc) + "\n")
+        self._append_to_spill(lines)
+
+    def _append_to_spill(self, lines):
+        with open(self.spill_path, "ab+") as f:
+            f.seek(0, os.SEEK_END)
+            # A last line cut short by a crash must not swallow the first new one.
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            f.write("".join(lines).encode("utf-8"))
+
+    def _replay_path(self):
+        return f"{self.spill_path}.{os.getpid()}.replay"
+
+    def _recover_replays(self):
+        """Merge replay files left by a process that stopped mid-replay back into the spill file."""
+        leftovers = glob.glob(glob.escape(self.spill_path) + ".*.replay") + [self.spill_path + ".replay"]
+        for path in leftovers:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    lines = f.readlines()
+                os.remove(path)
+            except OSError:
+                continue  # gone, or taken by another process
+            # Replaying a document twice is harmless: its _id makes the second insert a duplicate.
+            self._append_to_spill(line if line.endswith("\n") else line + "\n" for line in lines)
+
+    def _replay_spill(self):
+        """Re-insert spilled documents once MongoDB accepts writes again."""
+        replay_path = self._replay_path()
+        try:
+            os.replace(self.spill_path, replay_path)
+            with open(replay_path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return  # another process is replaying it
+        docs = []
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                doc = json.loads(line)
+                doc["timestamp"] = datetime.fromisoformat(doc["timestamp"])
+                doc["end"] = datetime.fromisoformat(doc["end"])
+                # Spills written before intervals had ids get a fresh one.
+                doc["_id"] = ObjectId(doc["_id"]) if "_id" in doc else ObjectId()
+            except (ValueError, KeyError, TypeError, InvalidId) as e:
+                logger.warning("Skipping unreadable face log line %d of %s: %s", number, replay_path, e)
+                continue
+            docs.append(doc)
+        for start in range(0, len(docs), self.batch_size):
+            unwritten = self._insert(docs[start:start + self.batch_size])
+            if unwritten is None:
+                self._spill(docs[start:])
+                self._back_off()
+                break
+            if unwritten:
+                self._spill(unwritten)
+        try:
+            os.remove(replay_path)
+        except OSError:
+            pass
+
+
+_violation_logger = None
+_violation_logger_lock = threading.Lock()
+
+
+def get_violation_logger():
+    """Return the process-wide ViolationLogger."""
+    global _violation_logger
+    if _violation_logger is None:
+        with _violation_logger_lock:
+            if _violation_logger is None:
+                _violation_logger = ViolationLogger()
+                atexit.register(_violation_logger.close)
+    return _violation_logger
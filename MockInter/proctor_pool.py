@@ -0,0 +1,126 @@
+"""
+Optional process-pool backend for proctoring analysis.
+
+With ``PROCTOR_BACKEND=process`` each ``VideoTransformer`` copies its
+grayscale frame into a per-stream shared-memory buffer and hands the
+detection pass (face cascade, eye cascade, pupil contours) to a pool of
+worker processes, so concurrent streams are no longer serialised on the GIL
+of the Streamlit process. Results come back asynchronously and are used for
+the next frames' counters and overlay.
+
+A stream has at most one frame in flight; frames that arrive while its
+analysis is still running are not analysed and are counted as dropped.
+``PROCTOR_WORKERS`` sets the pool size (default: number of CPUs).
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from detection import analyze_gray
+from models import load_cascade
+
+PROCTOR_BACKEND = os.getenv("PROCTOR_BACKEND", "thread")
+
+# Per-worker state, set up by _init_worker.
+_face_cascade = None
+_eye_cascade = None
+
+
+def _init_worker():
+    global _face_cascade, _eye_cascade
+    cv2.setNumThreads(1)  # parallelism comes from the pool, not from OpenCV
+    _face_cascade = load_cascade("face")
+    _eye_cascade = load_cascade("eye")
+
+
+def _analyze_shared(shm_name, shape, prev_faces, full_scan, gaze_method):
+    """Worker entry point: analyse the frame currently held in shared memory."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        gray = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        start = time.perf_counter()
+        faces, eyes, eye_violation = analyze_gray(_face_cascade, _eye_cascade, gray, prev_faces, full_scan,
+                                                  gaze_method=gaze_method)
+        cost = time.perf_counter() - start
+        del gray  # the buffer cannot be closed while a view on it exists
+    finally:
+        shm.close()
+    return {
+        "faces": faces,
+        "eyes": [tuple(int(v) for v in eye) for eye in eyes],
+        "eye_violation": eye_violation,
+        "cost": cost,
+    }
+
+
+class StreamSlot:
+    """Shared-memory frame buffer and in-flight state for one video stream."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.shm = None
+        self.shape = None
+        self.busy = False
+        self.dropped = 0
+
+    def submit(self, gray, prev_faces, full_scan, gaze_method, on_result):
+        """Ship ``gray`` to a worker unless this stream already has a frame in flight.
+
+        ``on_result`` is called from the pool's result thread with the
+        analysis dict. Returns False if the frame was dropped.
+        """
+        if self.busy:
+            self.dropped += 1
+            return False
+        if self.shape != gray.shape:
+            self._release()
+            self.shm = shared_memory.SharedMemory(create=True, size=gray.nbytes)
+            self.shape = gray.shape
+        np.copyto(np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf), gray)
+        self.busy = True
+
+        def done(result):
+            self.busy = False
+            on_result(result)
+
+        def failed(_error):
+            self.busy = False
+
+        self.pool.apply_async(_analyze_shared, (self.shm.name, self.shape, list(prev_faces), full_scan, gaze_method),
+                              callback=done, error_callback=failed)
+        return True
+
+    def close(self):
+        self._release()
+
+    def _release(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+            self.shape = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_proctor_pool():
+    """Return the process-wide worker pool, starting it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a threaded Streamlit server is not safe.
+                ctx = multiprocessing.get_context("spawn")
+                workers = int(os.getenv("PROCTOR_WORKERS", "0")) or os.cpu_count()
+                _pool = ctx.Pool(workers, initializer=_init_worker)
+                atexit.register(_pool.terminate)
+    return _pool
+
@@ -0,0 +1,262 @@
+"""
+Proctoring video transformer used by the MockInter webrtc stream.
+
+Handles No Face, Multiple Faces and Eye-Gaze detection. The cascades run on
+a downscaled frame and only on the frames picked by ``DetectionScheduler``;
+the frames in between reuse the last face boxes and gaze decision. The
+``frame_threshold`` smoothing counts consecutive detections, not frames, so
+a reused result is not counted again while the detection interval grows.
+
+With ``backend="process"`` (or ``PROCTOR_BACKEND=process``) the detection
+pass runs in the worker pool from proctor_pool.py and its result is picked
+up by the frames that follow.
+
+The same face detection also feeds emotion tracking: when an
+``EmotionTracker`` is attached, the single detected face is cropped from
+the frame and offered to it, so the camera is decoded and faces are found
+only once per frame for both features.
+"""
+import threading
+import time
+
+import cv2
+from streamlit_webrtc import VideoTransformerBase
+
+from detection import GAZE_METHOD, DetectionScheduler, FrameBuffers, StageTimer, analyze_gray
+from models import acquire_cascade, release_cascade
+from proctor_log import get_violation_logger
+from proctor_pool import PROCTOR_BACKEND, StreamSlot, get_proctor_pool
+from telemetry import StreamTelemetry
+
+
+def store_face_log(student_id, message):
+    """Log proctoring violations in the database.
+
+    Called from the video callback, so it only queues the event; the
+    background ViolationLogger coalesces and writes it (see proctor_log.py).
+    """
+    get_violation_logger().log(student_id, message)
+
+
+class VideoTransformer(VideoTransformerBase):
+    def __init__(self, backend=PROCTOR_BACKEND, clock=time.time, gaze_method=GAZE_METHOD):
+        # Haar Cascades for face and eye detection, checked out from the
+        # process-wide registry (parsed once, reused across sessions).
+        self.face_cascade = acquire_cascade("face")
+        self.eye_cascade = acquire_cascade("eye")
+
+        # Warning counters and timers. ``clock`` is replaceable so recorded
+        # clips can be replayed on their own timeline (see bench_proctoring.py).
+        self.clock = clock
+        self.no_face_warning_count = 0
+        self.multiple_face_warning_count = 0
+        self.eye_gaze_warning_count = 0
+        self.last_no_face_warning_time = clock()
+        self.last_multiple_warning_time = clock()
+        self.last_eye_gaze_warning_time = clock()
+        self.test_terminated = False
+
+        # Smoothing parameters: count consecutive detections without / with several faces.
+        self.no_face_frames = 0
+        self.multiple_face_frames = 0
+        self.frame_threshold = 5  # For face and multiple face detection
+
+        # Timing thresholds.
+        self.warning_interval = 2  # seconds between warnings.
+        self.warning_limit = 10  # number of warnings before termination.
+
+        # Detection scheduling: results of the last detection are reused
+        # until the scheduler asks for the next one.
+        self.scheduler = DetectionScheduler()
+        self.faces = []
+        self.eyes = []
+        self.eye_violation = False
+        self._fresh_result = False  # set when a detection result arrives, cleared once counted
+        self.gaze_method = gaze_method  # pupil estimator, see gaze.py
+
+        # Reusable per-resolution arrays (gray frame, overlay tint, text layers).
+        self.buffers = FrameBuffers()
+        self.overlay_alpha = 0.4
+
+        # Per-stage timings of the last frame and the message it showed,
+        # plus rolling per-stream telemetry (see telemetry.py).
+        self.timer = StageTimer()
+        self.telemetry = StreamTelemetry()
+        self.violation_message = None
+
+        # Where the detection pass runs: "thread" (inline) or "process" (worker pool).
+        self.backend = backend
+        self.slot = StreamSlot(get_proctor_pool()) if backend == "process" else None
+
+        # Control for proctoring activation.
+        self.proctoring_enabled = False
+
+        # Optional: emotion.EmotionTracker fed with the detected face.
+        self.emotion_tracker = None
+
+        # Optional: student id to log violations.
+        self.student_id = None
+
+        # on_ended can run while a frame is still being transformed on another
+        # thread; the cascades go back to the shared registry only under this lock.
+        # Worker-pool results (_apply_result) are applied under it as well.
+        self._frame_lock = threading.Lock()
+        self._ended = False
+
+    def transform(self, frame):
+        with self._frame_lock:
+            if self._ended:
+                return frame.to_ndarray(format="bgr24")
+            return self._transform(frame)
+
+    def _transform(self, frame):
+        start = time.perf_counter()
+        img = frame.to_ndarray(format="bgr24")
+
+        # If neither proctoring nor emotion tracking is enabled, simply return the frame.
+        if not self.proctoring_enabled and self.emotion_tracker is None:
+            self.telemetry.record_frame(frame, {}, time.perf_counter() - start)
+            return img
+
+        self.timer.reset()
+        self.buffers.ensure(img.shape)
+        with self.timer.stage("gray"):
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=self.buffers.gray)
+        current_time = self.clock()
+        violation_message = None
+
+        if self.scheduler.should_detect():
+            if self.slot is not None:
+                self.slot.submit(gray, self.faces, self.scheduler.needs_full_scan(), self.gaze_method,
+                                 self._apply_result)
+            else:
+                detect_start = time.perf_counter()
+                self.detect(gray)
+                self.scheduler.record(time.perf_counter() - detect_start)
+        faces = self.faces
+
+        # Emotion sampling on the face found above (before anything is drawn on the frame).
+        tracker = self.emotion_tracker
+        if tracker is not None and len(faces) == 1 and tracker.ready():
+            with self.timer.stage("emotion"):
+                (fx, fy, fw, fh) = faces[0]
+                tracker.offer(img[fy:fy + fh, fx:fx + fw].copy(), face_only=True)
+
+        if not self.proctoring_enabled:
+            self.telemetry.record_frame(frame, self.timer.times, time.perf_counter() - start)
+            return img
+
+        fresh_result, self._fresh_result = self._fresh_result, False
+
+        # ---------------------------
+        # No Face Detection
+        # ---------------------------
+        if len(faces) == 0:
+            if fresh_result:
+                self.no_face_frames += 1
+            if self.no_face_frames >= self.frame_threshold:
+                if current_time - self.last_no_face_warning_time > self.warning_interval:
+                    self.no_face_warning_count += 1
+                    self.last_no_face_warning_time = current_time
+                    if self.student_id:
+                        store_face_log(self.student_id, "No Face Detected!")
+                violation_message = "No Face Detected!"
+        else:
+            self.no_face_frames = 0
+
+        # ---------------------------
+        # Multiple Faces Detection
+        # ---------------------------
+        if len(faces) > 1:
+            if fresh_result:
+                self.multiple_face_frames += 1
+            if self.multiple_face_frames >= self.frame_threshold:
+                if current_time - self.last_multiple_warning_time > self.warning_interval:
+                    self.multiple_face_warning_count += 1
+                    self.last_multiple_warning_time = current_time
+                    if self.student_id:
+                        store_face_log(self.student_id, "Multiple Faces Detected!")
+                violation_message = "Multiple Faces Detected!"
+        else:
+            self.multiple_face_frames = 0
+
+        # Draw rectangles around detected faces.
+        with self.timer.stage("overlay"):
+            for (x, y, w, h) in faces:
+                cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+        # ---------------------------
+        # Eye-Gaze Detection (only when exactly one face is detected)
+        # ---------------------------
+        if len(faces) == 1:
+            (fx, fy, fw, fh) = faces[0]
+            # Draw rectangles around detected eyes.
+            with self.timer.stage("overlay"):
+                for (ex, ey, ew, eh) in self.eyes:
+                    cv2.rectangle(img, (fx + ex, fy + ey), (fx + ex + ew, fy + ey + eh), (255, 0, 0), 2)
+
+            # Continuously show the warning if a violation is detected.
+            if self.eye_violation:
+                violation_message = "Not Looking at Screen!"
+                if current_time - self.last_eye_gaze_warning_time > self.warning_interval:
+                    self.eye_gaze_warning_count += 1
+                    self.last_eye_gaze_warning_time = current_time
+                    if self.student_id:
+                        store_face_log(self.student_id, "Not Looking at Screen!")
+
+        # ---------------------------
+        # Persistent Overlay of Violation Message
+        # ---------------------------
+        self.violation_message = violation_message
+        if violation_message:
+            with self.timer.stage("overlay"):
+                # Tint and text are blended in place from cached layers.
+                alpha = self.overlay_alpha
+                cv2.addWeighted(self.buffers.tint, alpha, img, 1 - alpha, 0, dst=img)
+                cv2.max(img, self.buffers.text_layer(violation_message), dst=img)
+
+        # ---------------------------
+        # Check if Warning Limits Exceeded (terminate interview if so)
+        # ---------------------------
+        if (self.no_face_warning_count >= self.warning_limit or
+                self.multiple_face_warning_count >= self.warning_limit or
+                self.eye_gaze_warning_count >= self.warning_limit):
+            self.test_terminated = True
+
+        if self.slot is not None:
+            self.telemetry.record_skipped(self.slot.dropped, int(self.slot.busy))
+        self.telemetry.record_frame(frame, self.timer.times, time.perf_counter() - start)
+        return img
+
+    def detect(self, gray):
+        """Refresh ``faces``, ``eyes`` and ``eye_violation`` from a grayscale frame."""
+        self.faces, self.eyes, self.eye_violation = analyze_gray(
+            self.face_cascade, self.eye_cascade, gray, self.faces, self.scheduler.needs_full_scan(),
+            self.timer, self.buffers, self.gaze_method)
+        self._fresh_result = True
+
+    def _apply_result(self, result):
+        """Take over a detection result from the worker pool.
+
+        Runs on the pool's result thread (never inside ``slot.submit``), so it
+        takes the frame lock to update the state ``_transform`` reads.
+        """
+        with self._frame_lock:
+            if self._ended:
+                return
+            self.faces, self.eyes, self.eye_violation = result["faces"], result["eyes"], result["eye_violation"]
+            self._fresh_result = True
+            self.scheduler.record(result["cost"])
+
+    def on_ended(self):
+        # Called by streamlit-webrtc when the stream stops.
+        with self._frame_lock:
+            if self._ended:
+                return
+            self._ended = True
+            if self.slot is not None:
+                self.slot.close()
+            self.telemetry.close()
+            release_cascade("face", self.face_cascade)
+            release_cascade("eye", self.eye_cascade)
+            self.face_cascade = self.eye_cascade = None
@@ -0,0 +1,193 @@
+"""
+Persistent interview question bank.
+
+Generating questions is a Gemini round-trip on every "Start Interview",
+although students ask for the same roles over and over. The bank keeps
+generated questions per normalized (role, stack, experience) key in
+MongoDB and serves interviews from it:
+
+* ``normalize_key`` ignores case and extra whitespace, sorts and
+  de-duplicates the comma-separated stack items and maps years of
+  experience to a band, so "React, node.js" at 3 years and "Node.js,react"
+  at 4 years share one pool.
+* ``QuestionBank.get_questions`` samples questions the user has not been
+  served for that key yet and records them as served; once a user has seen
+  the whole pool it starts over. Pools are cached in memory, so a warm
+  start costs one small MongoDB round-trip. Only a cold or exhausted pool
+  calls the generator on the request path.
+* Pools below ``min_pool`` questions are topped up in the background, and
+  ``start_prewarm`` periodically tops up the most requested keys plus a
+  list of known popular (role, stack, experience) requests.
+
+If MongoDB is unreachable the bank falls back to generating the questions
+directly.
+"""
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+
+from common.db import get_collection
+
+logger = logging.getLogger(__name__)
+
+# (upper bound in years, band name, years used when generating for the band)
+EXPERIENCE_BANDS = ((1, "entry", 0), (4, "junior", 2), (7, "mid", 5), (12, "senior", 9), (None, "staff", 15))
+BAND_YEARS = {name: years for _, name, years in EXPERIENCE_BANDS}
+
+
+def experience_band(experience):
+    """Name and representative years of the band ``experience`` falls into."""
+    for upper, name, years in EXPERIENCE_BANDS:
+        if upper is None or experience <= upper:
+            return name, years
+
+
+def normalize_key(job_role, tech_stack, experience):
+    """Cache key for a request: ``(role, stack, band)`` with normalized text."""
+    role = " ".join(job_role.lower().split())
+    items = {" ".join(item.lower().split()) for item in re.split(r"[,;/]", tech_stack)}
+    stack = ", ".join(sorted(item for item in items if item))
+    band, _ = experience_band(experience)
+    return role, stack, band
+
+
+class QuestionBank:
+    """Serve interview questions from a MongoDB-backed pool per normalized key.
+
+    ``generate(job_role, tech_stack, experience)`` returns a list of new
+    questions (``get_gemini_questions``).
+    """
+
+    def __init__(self, generate, db_name, count=5, min_pool=15):
+        self.generate = generate
+        self.db_name = db_name
+        self.count = count
+        self.min_pool = min_pool
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._topping_up = set()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="question-bank")
+        self._indexes_ready = False
+        self._prewarm_thread = None
+
+    def _bank(self):
+        return get_collection(self.db_name, "question_bank")
+
+    def _served(self):
+        return get_collection(self.db_name, "question_bank_served")
+
+    def _ensure_indexes(self):
+        if not self._indexes_ready:
+            self._bank().create_index([("role", ASCENDING), ("stack", ASCENDING), ("band", ASCENDING)], unique=True)
+            self._bank().create_index([("requests", DESCENDING)])
+            self._served().create_index([("username", ASCENDING), ("key", ASCENDING)], unique=True)
+            self._indexes_ready = True
+
+    def get_questions(self, username, job_role, tech_stack, experience):
+        """Return ``count`` questions for the user, preferring ones they have not seen."""
+        key = normalize_key(job_role, tech_stack, experience)
+        try:
+            self._ensure_indexes()
+            pool = self._pool(key)
+            if len(pool) < self.count:
+                pool = self._top_up(key, job_role, tech_stack, experience)
+            served_key = "|".join(key)
+            doc = self._served().find_one({"username": username, "key": served_key}, {"questions": 1})
+            seen = set(doc["questions"]) if doc else set()
+            unseen = [q for q in pool if q not in seen]
+            if len(unseen) < self.count:
+                # The user has been through the pool: top it up in the background and start over.
+                self._top_up_later(key, job_role, tech_stack, experience)
+                seen, unseen = set(), pool
+            questions = random.sample(unseen, min(self.count, len(unseen)))
+            update = {"$addToSet": {"questions": {"$each": questions}}} if seen else {"$set": {"questions": questions}}
+            self._served().update_one({"username": username, "key": served_key}, update, upsert=True)
+            self._bank().update_one(self._filter(key), {"$inc": {"requests": 1}})
+            if len(pool) < self.min_pool:
+                self._top_up_later(key, job_role, tech_stack, experience)
+            return questions
+        except PyMongoError as e:
+            logger.warning("Question bank unavailable, generating directly: %s", e)
+            return self.generate(job_role, tech_stack, experience)
+
+    def prewarm(self, seeds=(), limit=20):
+        """Fill the pools of ``seeds`` and of the ``limit`` most requested keys up to ``min_pool``.
+
+        ``seeds`` are ``(job_role, tech_stack, experience)`` tuples.
+        """
+        self._ensure_indexes()
+        wanted = {normalize_key(*seed): seed for seed in seeds}
+        cursor = self._bank().find({}, {"role": 1, "stack": 1, "band": 1}).sort("requests", DESCENDING).limit(limit)
+        for doc in cursor:
+            wanted.setdefault((doc["role"], doc["stack"], doc["band"]),
+                              (doc["role"], doc["stack"], BAND_YEARS[doc["band"]]))
+        for key, request in wanted.items():
+            for _ in range(self.min_pool // self.count + 1):
+                if len(self._pool(key)) >= self.min_pool:
+                    break
+                self._top_up(key, *request)
+
+    def start_prewarm(self, seeds=(), interval=3600, limit=20):
+        """Run ``prewarm`` now and then every ``interval`` seconds in a daemon thread."""
+        if self._prewarm_thread is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.prewarm(seeds, limit)
+                except Exception:
+                    logger.exception("Question bank pre-warm failed")
+                time.sleep(interval)
+
+        self._prewarm_thread = threading.Thread(target=run, name="question-bank-prewarm", daemon=True)
+        self._prewarm_thread.start()
+
+    @staticmethod
+    def _filter(key):
+        role, stack, band = key
+        return {"role": role, "stack": stack, "band": band}
+
+    def _pool(self, key):
+        pool = self._pools.get(key)
+        if pool is None:
+            doc = self._bank().find_one(self._filter(key), {"questions": 1})
+            pool = doc["questions"] if doc else []
+            with self._lock:
+                self._pools[key] = pool
+        return pool
+
+    def _top_up(self, key, job_role, tech_stack, experience):
+        """Generate more questions for ``key`` and add the new ones to the stored pool."""
+        generated = self.generate(job_role, tech_stack, experience)
+        doc = self._bank().find_one_and_update(
+            self._filter(key),
+            {"$addToSet": {"questions": {"$each": generated}}, "$setOnInsert": {"requests": 0}},
+            projection={"questions": 1}, upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        with self._lock:
+            self._pools[key] = doc["questions"]
+        return doc["questions"]
+
+    def _top_up_later(self, key, job_role, tech_stack, experience):
+        with self._lock:
+            if key in self._topping_up:
+                return
+            self._topping_up.add(key)
+
+        def run():
+            try:
+                self._top_up(key, job_role, tech_stack, experience)
+            except Exception:
+                logger.exception("Question bank top-up for %s failed", key)
+            finally:
+                with self._lock:
+                    self._topping_up.discard(key)
+
+        self._executor.submit(run)
@@ -0,0 +1,83 @@
+"""
+Batch end-of-interview scoring with structured output.
+
+Instead of one free-text Gemini request per answer, ``score_interview``
+sends every question/answer pair of an interview in a single request whose
+response is constrained to ``SCORE_SCHEMA`` (JSON). Each answer gets a
+numeric ``score`` out of 10, one score per ``RUBRIC`` dimension and written
+``feedback``, so the stored documents can be filtered and aggregated in
+MongoDB directly, e.g.::
+
+    feedbacks.aggregate([{"$group": {"_id": "$username", "avg": {"$avg": "$score"}}}])
+"""
+import json
+
+from common.gemini import generative_model, get_genai
+
+MODEL_NAME = "gemini-1.5-flash"
+RUBRIC = ("correctness", "depth", "relevance", "communication")
+
+SCORE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "answers": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "index": {"type": "INTEGER"},
+                    "score": {"type": "NUMBER"},
+                    "rubric": {
+                        "type": "OBJECT",
+                        "properties": {dimension: {"type": "NUMBER"} for dimension in RUBRIC},
+                        "required": list(RUBRIC),
+                    },
+                    "feedback": {"type": "STRING"},
+                },
+                "required": ["index", "score", "rubric", "feedback"],
+            },
+        },
+    },
+    "required": ["answers"],
+}
+
+
+def build_prompt(items):
+    """Prompt for ``items``, a list of ``(question, answer)`` pairs."""
+    blocks = "\n\n".join(f"[{i}]\nQuestion: {question}\nAnswer: {answer or '(no answer)'}"
+                         for i, (question, answer) in enumerate(items))
+    return f"""
+    Evaluate each of the candidate's answers to the interview questions below.
+    For every answer give an overall score from 0 to 10, a score from 0 to 10 for each of
+    {", ".join(RUBRIC)}, and detailed feedback. Use the number in brackets as the answer index.
+
+    {blocks}
+    """
+
+
+def _clamp(value):
+    return min(10.0, max(0.0, float(value)))
+
+
+def parse_scores(text, count):
+    """Turn the JSON response into one ``{"score", "rubric", "feedback"}`` dict (or None) per answer."""
+    scores = [None] * count
+    for entry in json.loads(text)["answers"]:
+        index = entry.get("index")
+        if isinstance(index, int) and 0 <= index < count:
+            scores[index] = {
+                "score": _clamp(entry["score"]),
+                "rubric": {dimension: _clamp(entry["rubric"][dimension]) for dimension in RUBRIC},
+                "feedback": entry["feedback"],
+            }
+    return scores
+
+
+def score_interview(items, timeout=None):
+    """Score all ``(question, answer)`` pairs of an interview with one model request."""
+    model = generative_model(MODEL_NAME)
+    config = get_genai().GenerationConfig(response_mime_type="application/json", response_schema=SCORE_SCHEMA)
+    request_options = {"timeout": timeout} if timeout else None
+    response = model.generate_content([build_prompt(items)], generation_config=config,
+                                      request_options=request_options)
+    return parse_scores(response.text, len(items))
@@ -0,0 +1,204 @@
+"""
+Per-stream proctoring telemetry and a Prometheus text endpoint.
+
+Every ``VideoTransformer`` owns a ``StreamTelemetry`` that records, per
+frame, the rolling fps, per-stage latencies (from ``StageTimer``), frames
+the webrtc layer dropped before they reached ``transform`` (detected from
+gaps in the frame ``pts``) and frames whose analysis was skipped because
+the process-pool worker was still busy. The sidebar shows one stream's
+snapshot; ``start_metrics_server`` serves the totals over all live streams
+in this process at ``/metrics`` so a saturated host can be alerted on.
+"""
+import bisect
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+from proctor_log import get_violation_logger
+
+# Histogram bucket upper bounds, in seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5)
+METRICS_HOST = os.getenv("PROCTOR_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("PROCTOR_METRICS_PORT", "9464"))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (Prometheus semantics)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class StreamTelemetry:
+    """Rolling measurements for one video stream."""
+
+    def __init__(self, window=90):
+        self.frames = 0
+        self.dropped_frames = 0
+        self.analysis_skipped = 0
+        self.in_flight = 0
+        self.histograms = {}
+        self._frame_times = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+        self._last_pts = None
+        self._pts_step = None
+        _streams.add(self)
+
+    def record_frame(self, frame, stage_times, latency):
+        """Record one processed frame: its per-stage times and total ``transform`` latency."""
+        self.frames += 1
+        _add_total("frames", 1)
+        self._frame_times.append(time.monotonic())
+        self._latencies.append(latency)
+        self._observe("total", latency)
+        for stage, seconds in stage_times.items():
+            self._observe(stage, seconds)
+        self._count_dropped(getattr(frame, "pts", None))
+
+    def record_skipped(self, skipped, in_flight):
+        """Update the process-pool counters (analysis skipped while busy, frames in flight)."""
+        _add_total("analysis_skipped", skipped - self.analysis_skipped)
+        self.analysis_skipped = skipped
+        self.in_flight = in_flight
+
+    def close(self):
+        """Stop reporting this stream in the process-wide metrics."""
+        _streams.discard(self)
+
+    def fps(self):
+        if len(self._frame_times) < 2:
+            return 0.0
+        span = self._frame_times[-1] - self._frame_times[0]
+        return (len(self._frame_times) - 1) / span if span > 0 else 0.0
+
+    def snapshot(self):
+        """Current values for display."""
+        import numpy as np  # only needed once the page shows the stream health
+
+        latencies = list(self._latencies)
+        return {
+            "fps": self.fps(),
+            "p95_ms": float(np.percentile(latencies, 95)) * 1000 if latencies else 0.0,
+            "stage_ms": {stage: h.total / h.count * 1000 for stage, h in self.histograms.items() if h.count},
+            "dropped_frames": self.dropped_frames,
+            "analysis_skipped": self.analysis_skipped,
+            "queue_depth": get_violation_logger().queue_depth() + self.in_flight,
+        }
+
+    def _observe(self, stage, seconds):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.observe(seconds)
+        with _totals_lock:
+            total = _stage_totals.get(stage)
+            if total is None:
+                total = _stage_totals[stage] = Histogram()
+            total.observe(seconds)
+
+    def _count_dropped(self, pts):
+        # The smallest pts step seen is one frame; larger gaps are frames
+        # that were dropped before reaching transform.
+        if pts is None:
+            return
+        if self._last_pts is not None:
+            step = pts - self._last_pts
+            if step > 0:
+                if self._pts_step is None or step < self._pts_step:
+                    self._pts_step = step
+                missed = round(step / self._pts_step) - 1
+                if missed > 0:
+                    self.dropped_frames += missed
+                    _add_total("dropped_frames", missed)
+        self._last_pts = pts
+
+
+_streams = weakref.WeakSet()
+_totals = {"frames": 0, "dropped_frames": 0, "analysis_skipped": 0}
+_stage_totals = {}
+_totals_lock = threading.Lock()
+
+
+def _add_total(name, amount):
+    # Streams call this from their own threads; += on a shared dict entry is not atomic.
+    with _totals_lock:
+        _totals[name] += amount
+
+
+def render_prometheus():
+    """All metrics of this process in the Prometheus text exposition format."""
+    streams = list(_streams)
+    fps = [stream.fps() for stream in streams]
+    lines = [
+        "# HELP proctor_streams_active Video streams with live telemetry.",
+        "# TYPE proctor_streams_active gauge",
+        f"proctor_streams_active {len(streams)}",
+        "# HELP proctor_fps_total Sum of the rolling fps of all streams.",
+        "# TYPE proctor_fps_total gauge",
+        f"proctor_fps_total {sum(fps):.3f}",
+        "# HELP proctor_fps_min Rolling fps of the slowest stream.",
+        "# TYPE proctor_fps_min gauge",
+        f"proctor_fps_min {min(fps) if fps else 0:.3f}",
+        "# HELP proctor_queue_depth Violation events waiting to be written plus frames in worker analysis.",
+        "# TYPE proctor_queue_depth gauge",
+        f"proctor_queue_depth {get_violation_logger().queue_depth() + sum(s.in_flight for s in streams)}",
+    ]
+    with _totals_lock:
+        totals = dict(_totals)
+    for name, help_text in (
+            ("frames", "Frames processed by transform."),
+            ("dropped_frames", "Frames dropped before reaching transform."),
+            ("analysis_skipped", "Frames not analysed because the stream's worker was busy.")):
+        lines += [f"# HELP proctor_{name}_total {help_text}",
+                  f"# TYPE proctor_{name}_total counter",
+                  f"proctor_{name}_total {totals[name]}"]
+    lines += ["# HELP proctor_stage_latency_seconds Per-stage frame processing time.",
+              "# TYPE proctor_stage_latency_seconds histogram"]
+    with _totals_lock:
+        for stage, histogram in sorted(_stage_totals.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'proctor_stage_latency_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'proctor_stage_latency_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+            lines.append(f'proctor_stage_latency_seconds_count{{stage="{stage}"}} {histogram.count}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve ``/metrics`` from a daemon thread; returns the server, or None if the port is taken."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError:
+        return None
+    threading.Thread(target=server.serve_forever, name="proctor-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,423 @@
+"""
+Streaming answer transcription from browser audio.
+
+The candidate's microphone arrives over the same streamlit-webrtc
+connection as the camera. ``AnswerAudioProcessor`` receives its frames,
+and while an answer is being recorded it hands them to a
+``StreamingTranscriber``:
+
+* frames are mixed down to mono and resampled to 16 kHz,
+* a voice-activity detector (``EnergyVAD``, or ``WebRTCVAD`` if the
+  optional ``webrtcvad`` package is installed) splits the audio into
+  speech segments at pauses (``Segmenter``),
+* each finished segment is transcribed right away on a background thread
+  by a pluggable recognizer, so the transcript grows while the candidate
+  is still talking and there is no length limit on an answer.
+
+Recognizers (``TRANSCRIBE_BACKEND``):
+
+* ``"google"`` - speech_recognition's Google Web Speech client (network).
+* ``"vosk"`` - offline, local recognition with the optional ``vosk``
+  package and a model directory at ``VOSK_MODEL_PATH``.
+
+The stack can be exercised without a browser on recorded WAV files::
+
+    python transcription.py answer.wav
+    python transcription.py answer.wav --backend vosk --vad webrtc --realtime
+    python transcription.py answer.wav --backend none     # segmentation only
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import av
+    from streamlit_webrtc import AudioProcessorBase
+except ImportError:  # the WAV command line does not need the webrtc stack
+    AudioProcessorBase = object
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "google")
+TRANSCRIBE_LANGUAGE = os.getenv("TRANSCRIBE_LANGUAGE", "en-US")
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "vosk-model-small-en-us-0.15")
+VAD_BACKEND = os.getenv("TRANSCRIBE_VAD", "energy")
+
+
+# ---------------------------
+# Audio conversion
+# ---------------------------
+class Resampler:
+    """Convert mono int16 chunks from ``src_rate`` to ``dst_rate``, carrying leftovers between chunks."""
+
+    def __init__(self, src_rate, dst_rate=SAMPLE_RATE):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self._rest = np.zeros(0, dtype=np.float32)
+
+    def __call__(self, samples):
+        if self.src_rate == self.dst_rate:
+            return samples.astype(np.int16, copy=False)
+        samples = np.concatenate([self._rest, samples.astype(np.float32)])
+        if self.src_rate % self.dst_rate == 0:
+            # 48 kHz -> 16 kHz: average blocks of ``factor`` samples.
+            factor = self.src_rate // self.dst_rate
+            usable = len(samples) - len(samples) % factor
+            self._rest = samples[usable:]
+            out = samples[:usable].reshape(-1, factor).mean(axis=1)
+        else:
+            count = int(len(samples) * self.dst_rate / self.src_rate)
+            positions = np.arange(count) * (self.src_rate / self.dst_rate)
+            out = np.interp(positions, np.arange(len(samples)), samples) if count else np.zeros(0)
+            self._rest = samples[int(round(count * self.src_rate / self.dst_rate)):]
+        return out.astype(np.int16)
+
+
+def frame_to_mono(frame):
+    """Mono int16 samples and sample rate of an ``av.AudioFrame`` (packed or planar s16)."""
+    samples = frame.to_ndarray()
+    channels = len(frame.layout.channels)
+    if frame.format.is_planar:
+        mono = samples.mean(axis=0)
+    else:
+        mono = samples.reshape(-1, channels).mean(axis=1)
+    return mono.astype(np.int16), frame.sample_rate
+
+
+# ---------------------------
+# Voice activity detection
+# ---------------------------
+class EnergyVAD:
+    """Speech/non-speech per frame from its energy relative to an adaptive noise floor."""
+
+    def __init__(self, min_dbfs=-45.0, margin_db=10.0):
+        self.min_dbfs = min_dbfs
+        self.margin_db = margin_db
+        self.noise_dbfs = -60.0
+
+    def is_speech(self, frame):
+        rms = np.sqrt(np.mean(frame.astype(np.float32) ** 2)) if len(frame) else 0.0
+        dbfs = 20 * np.log10(max(rms, 1.0) / 32768)
+        speech = dbfs > max(self.min_dbfs, self.noise_dbfs + self.margin_db)
+        if not speech:
+            # Track the noise floor on non-speech frames only.
+            self.noise_dbfs = 0.95 * self.noise_dbfs + 0.05 * dbfs
+        return speech
+
+
+class WebRTCVAD:
+    """The WebRTC project's VAD (optional ``webrtcvad`` package); frames of 10, 20 or 30 ms."""
+
+    def __init__(self, aggressiveness=2, sample_rate=SAMPLE_RATE):
+        import webrtcvad
+
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+
+    def is_speech(self, frame):
+        return self.vad.is_speech(frame.tobytes(), self.sample_rate)
+
+
+def make_vad(kind=VAD_BACKEND):
+    """``"webrtc"`` falls back to the energy VAD when webrtcvad is not installed."""
+    if kind == "webrtc":
+        try:
+            return WebRTCVAD()
+        except ImportError:
+            logger.warning("webrtcvad is not installed, using the energy VAD")
+    return EnergyVAD()
+
+
+class Segmenter:
+    """Cut a 16 kHz int16 stream into speech segments at pauses.
+
+    A segment starts at the first voiced frame (with ``pre_roll_ms`` of audio
+    before it), ends after ``hangover_ms`` of silence and is force-split at
+    ``max_segment_s``. Segments with less than ``min_speech_ms`` of voiced
+    audio are dropped. ``push`` returns finished ``(start_seconds, pcm_bytes)``
+    segments.
+    """
+
+    def __init__(self, vad, sample_rate=SAMPLE_RATE, frame_ms=30, pre_roll_ms=300, hangover_ms=700,
+                 min_speech_ms=250, max_segment_s=15.0):
+        self.vad = vad
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.frame_ms = frame_ms
+        self.hangover_frames = hangover_ms // frame_ms
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_frames = int(max_segment_s * 1000 / frame_ms)
+        self._pre_roll = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self._buffer = np.zeros(0, dtype=np.int16)
+        self._offset = 0
+        self._segment = None
+        self._segment_start = 0
+        self._voiced = 0
+        self._silence = 0
+
+    def push(self, samples):
+        segments = []
+        self._buffer = np.concatenate([self._buffer, samples])
+        whole = len(self._buffer) - len(self._buffer) % self.frame_size
+        for start in range(0, whole, self.frame_size):
+            frame = self._buffer[start:start + self.frame_size]
+            segment = self._process(frame)
+            if segment is not None:
+                segments.append(segment)
+        self._buffer = self._buffer[whole:]
+        return segments
+
+    def flush(self):
+        """End the current segment (if any) regardless of silence."""
+        segment = self._finish()
+        return [segment] if segment is not None else []
+
+    def _process(self, frame):
+        speech = self.vad.is_speech(frame)
+        position = self._offset
+        self._offset += len(frame)
+        if self._segment is None:
+            self._pre_roll.append(frame)
+            if speech:
+                self._segment = list(self._pre_roll)
+                self._segment_start = position - (len(self._pre_roll) - 1) * self.frame_size
+                self._pre_roll.clear()
+                self._voiced, self._silence = 1, 0
+            return None
+        self._segment.append(frame)
+        if speech:
+            self._voiced += 1
+            self._silence = 0
+        else:
+            self._silence += 1
+        if self._silence >= self.hangover_frames or len(self._segment) >= self.max_frames:
+            return self._finish()
+        return None
+
+    def _finish(self):
+        segment, voiced = self._segment, self._voiced
+        self._segment, self._voiced, self._silence = None, 0, 0
+        if segment is None or voiced < self.min_speech_frames:
+            return None
+        return self._segment_start / self.sample_rate, np.concatenate(segment).tobytes()
+
+
+# ---------------------------
+# Recognizers
+# ---------------------------
+class GoogleRecognizer:
+    """Google Web Speech API through speech_recognition (needs network access)."""
+
+    name = "google"
+
+    def __init__(self, language=TRANSCRIBE_LANGUAGE):
+        import speech_recognition as sr
+
+        self._sr = sr
+        self.recognizer = sr.Recognizer()
+        self.language = language
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE):
+        try:
+            return self.recognizer.recognize_google(self._sr.AudioData(pcm, sample_rate, 2), language=self.language)
+        except self._sr.UnknownValueError:
+            return ""
+
+
+_vosk_models = {}
+_vosk_lock = threading.Lock()
+
+
+class VoskRecognizer:
+    """Offline recognition with Vosk; the model is loaded once per process."""
+
+    name = "vosk"
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        from vosk import Model
+
+        with _vosk_lock:
+            if model_path not in _vosk_models:
+                _vosk_models[model_path] = Model(model_path)
+        self.model = _vosk_models[model_path]
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE):
+        from vosk import KaldiRecognizer
+
+        recognizer = KaldiRecognizer(self.model, sample_rate)
+        recognizer.AcceptWaveform(pcm)
+        return json.loads(recognizer.FinalResult()).get("text", "")
+
+
+class NullRecognizer:
+    """Transcribes nothing; for measuring segmentation alone."""
+
+    name = "none"
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE):
+        return ""
+
+
+RECOGNIZERS = {"google": GoogleRecognizer, "vosk": VoskRecognizer, "none": NullRecognizer}
+
+
+def get_recognizer(name=TRANSCRIBE_BACKEND):
+    if name not in RECOGNIZERS:
+        raise ValueError(f"Unknown transcription backend: {name}")
+    return RECOGNIZERS[name]()
+
+
+# ---------------------------
+# Streaming transcriber
+# ---------------------------
+class StreamingTranscriber:
+    """Segment incoming audio and transcribe every segment as soon as it ends."""
+
+    def __init__(self, recognizer=None, vad=None, sample_rate=SAMPLE_RATE):
+        self.recognizer = recognizer or get_recognizer()
+        self.segmenter = Segmenter(vad or make_vad(), sample_rate)
+        self.sample_rate = sample_rate
+        self.segments = []  # (start_seconds, text, seconds spent transcribing)
+        self.error = None
+        self._resampler = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        # One worker keeps segments in spoken order.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcribe")
+
+    def feed(self, samples, sample_rate=SAMPLE_RATE):
+        """Add mono int16 samples recorded at ``sample_rate``."""
+        with self._lock:
+            if self._resampler is None or self._resampler.src_rate != sample_rate:
+                self._resampler = Resampler(sample_rate, self.sample_rate)
+            for segment in self.segmenter.push(self._resampler(samples)):
+                self._submit(segment)
+
+    def feed_frame(self, frame):
+        """Add one ``av.AudioFrame`` from streamlit-webrtc."""
+        self.feed(*frame_to_mono(frame))
+
+    def text(self):
+        """Transcript of all segments transcribed so far."""
+        return " ".join(text for _, text, _ in sorted(self.segments) if text)
+
+    def pending(self):
+        """Segments still waiting for the recognizer."""
+        return self._pending
+
+    def finish(self, timeout=10.0):
+        """Close the last segment, wait up to ``timeout`` s for outstanding segments and return the text."""
+        with self._lock:
+            for segment in self.segmenter.flush():
+                self._submit(segment)
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._executor.shutdown(wait=False)
+        return self.text()
+
+    def _submit(self, segment):
+        self._pending += 1
+        self._executor.submit(self._transcribe, *segment)
+
+    def _transcribe(self, start, pcm):
+        began = time.perf_counter()
+        try:
+            text = self.recognizer.transcribe(pcm, self.sample_rate)
+        except Exception as e:
+            logger.warning("Transcription of segment at %.1fs failed: %s", start, e)
+            self.error = e
+            text = ""
+        with self._lock:
+            self.segments.append((start, text, time.perf_counter() - began))
+            self._pending -= 1
+
+
+class AnswerAudioProcessor(AudioProcessorBase):
+    """streamlit-webrtc audio processor that feeds the attached ``transcriber``.
+
+    The audio sent back to the browser is silence, so candidates do not hear
+    themselves.
+    """
+
+    def __init__(self):
+        self.transcriber = None
+
+    def recv(self, frame):
+        return self._process([frame])[0]
+
+    async def recv_queued(self, frames):
+        return self._process(frames)
+
+    def _process(self, frames):
+        transcriber = self.transcriber
+        silent = []
+        for frame in frames:
+            if transcriber is not None:
+                transcriber.feed_frame(frame)
+            out = av.AudioFrame.from_ndarray(np.zeros_like(frame.to_ndarray()), format=frame.format.name,
+                                             layout=frame.layout.name)
+            out.sample_rate = frame.sample_rate
+            out.pts = frame.pts
+            out.time_base = frame.time_base
+            silent.append(out)
+        return silent
+
+
+# ---------------------------
+# WAV file testing
+# ---------------------------
+def read_wav(path):
+    """Mono int16 samples and sample rate of a 16-bit PCM WAV file."""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise SystemExit(f"{path}: only 16-bit PCM WAV files are supported")
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        channels, rate = f.getnchannels(), f.getframerate()
+    return samples.reshape(-1, channels).mean(axis=1).astype(np.int16), rate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe a WAV file through the streaming pipeline.")
+    parser.add_argument("wav")
+    parser.add_argument("--backend", choices=sorted(RECOGNIZERS), default=TRANSCRIBE_BACKEND)
+    parser.add_argument("--vad", choices=("energy", "webrtc"), default=VAD_BACKEND)
+    parser.add_argument("--chunk-ms", type=int, default=20, help="audio fed per call, like a webrtc frame")
+    parser.add_argument("--realtime", action="store_true", help="feed the audio at its real rate")
+    args = parser.parse_args(argv)
+
+    samples, rate = read_wav(args.wav)
+    transcriber = StreamingTranscriber(get_recognizer(args.backend), make_vad(args.vad))
+    chunk = rate * args.chunk_ms // 1000
+    started = time.perf_counter()
+    for i in range(0, len(samples), chunk):
+        if args.realtime:
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        transcriber.feed(samples[i:i + chunk], rate)
+    fed = time.perf_counter() - started
+    text = transcriber.finish(timeout=60)
+    total = time.perf_counter() - started
+
+    for start, segment_text, seconds in sorted(transcriber.segments):
+        print(f"[{start:7.2f}s] ({seconds * 1000:6.0f} ms) {segment_text}")
+    duration = len(samples) / rate
+    print(f"audio {duration:.1f} s  segments {len(transcriber.segments)}  fed in {fed:.2f} s  "
+          f"final text {total - fed:.2f} s after the end of the audio")
+    if transcriber.error is not None:
+        print(f"errors: {transcriber.error}")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
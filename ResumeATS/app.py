@@ -1,34 +1,40 @@
 import os
+import sys
 import streamlit as st
-import pdf2image
 import io
 import json
 import base64
-import google.generativeai as genai
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.gemini import generative_model
+from common.tracing import begin_rerun, traced
+
 # Load environment variables from .env file
+# (Google Generative AI is imported and configured with API_KEY on first use)
 load_dotenv()
 
-# Configure Google Generative AI with the API key from .env
-genai.configure(api_key=os.getenv('API_KEY'))
+# Spans of this script run share one trace (see common/tracing.py)
+begin_rerun("resume_ats")
 
 # Define cached functions
 @st.cache_data()
 def get_gemini_response(input, pdf_content, prompt):
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = generative_model('gemini-1.5-flash')
     response = model.generate_content([input, pdf_content[0], prompt])
     return response.text
 
 @st.cache_data()
 def get_gemini_response_keywords(input, pdf_content, prompt):
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = generative_model('gemini-1.5-flash')
     response = model.generate_content([input, pdf_content[0], prompt])
     return json.loads(response.text[8:-4])
 
+@traced("resume.input_pdf_setup")
 @st.cache_data()
 def input_pdf_setup(uploaded_file):
     if uploaded_file is not None:
+        import pdf2image  # only needed once a resume is analysed
         images = pdf2image.convert_from_bytes(uploaded_file.read())
         first_page = images[0]
         img_byte_arr = io.BytesIO()
@@ -0,0 +1 @@
+"""Shared helpers used by the CodingPract, MockInter and ResumeATS apps."""
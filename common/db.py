@@ -0,0 +1,232 @@
+"""
+Shared MongoDB access layer.
+
+Every app gets its collections through this module instead of building its own
+``MongoClient`` at import time. The client is created on first use, shared by
+the whole process and configured from the environment:
+
+    MONGO_URI                          connection string (default: localhost)
+    MONGO_MAX_POOL_SIZE                max pooled connections per host (50)
+    MONGO_MIN_POOL_SIZE                connections kept warm (0)
+    MONGO_MAX_IDLE_TIME_MS             idle time before a pooled socket closes (60000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS  how long an operation waits for a server (5000)
+    MONGO_CONNECT_TIMEOUT_MS           TCP connect timeout (5000)
+    MONGO_SOCKET_TIMEOUT_MS            per-operation socket timeout (10000)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS        how long to wait for a free pooled connection (5000)
+    MONGO_WRITE_BATCH_SIZE             max documents per buffered insert_many (100)
+    MONGO_WRITE_FLUSH_INTERVAL         max seconds a buffered write may wait (1.0)
+    MONGO_WRITE_MAX_PENDING            max buffered documents per collection (10000)
+
+High-rate writers use ``get_writer(db_name, collection_name).write(doc)``,
+which returns immediately and lets a background thread batch the documents
+into unordered ``insert_many`` calls.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from bson.errors import BSONError
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from common.tracing import command_listener
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MONGO_URI = "mongodb://localhost:27017/"
+
+_client = None
+_client_lock = threading.Lock()
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# ---------------------------
+# Client / collection access
+# ---------------------------
+def get_client():
+    """Return the process-wide MongoClient, creating it on first use.
+
+    ``connect=False`` defers the first network round-trip to the first
+    operation, so importing an app never blocks on MongoDB.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(
+                    os.getenv("MONGO_URI", DEFAULT_MONGO_URI),
+                    maxPoolSize=_env_int("MONGO_MAX_POOL_SIZE", 50),
+                    minPoolSize=_env_int("MONGO_MIN_POOL_SIZE", 0),
+                    maxIdleTimeMS=_env_int("MONGO_MAX_IDLE_TIME_MS", 60000),
+                    serverSelectionTimeoutMS=_env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+                    connectTimeoutMS=_env_int("MONGO_CONNECT_TIMEOUT_MS", 5000),
+                    socketTimeoutMS=_env_int("MONGO_SOCKET_TIMEOUT_MS", 10000),
+                    waitQueueTimeoutMS=_env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000),
+                    # Every command becomes a span (see common/tracing.py).
+                    event_listeners=[listener for listener in (command_listener(),) if listener],
+                    connect=False,
+                )
+    return _client
+
+
+def get_db(db_name):
+    """Return a database handle from the shared client."""
+    return get_client()[db_name]
+
+
+def get_collection(db_name, collection_name):
+    """Return a collection handle from the shared client."""
+    return get_client()[db_name][collection_name]
+
+
+# ---------------------------
+# Write-behind buffer
+# ---------------------------
+class BufferedWriter:
+    """Batch inserts into one collection from a background thread.
+
+    ``write`` only appends to an in-memory buffer. The flusher thread sends a
+    batch as soon as ``batch_size`` documents are pending or the oldest
+    pending document has waited ``flush_interval`` seconds. If MongoDB is
+    unreachable the batch is put back and retried; once ``max_pending``
+    documents are buffered the oldest ones are dropped and counted. A batch
+    that cannot be encoded at all is logged and dropped, not retried.
+    """
+
+    def __init__(self, db_name, collection_name, batch_size=None, flush_interval=None, max_pending=None):
+        self.db_name = db_name
+        self.collection_name = collection_name
+        self.batch_size = batch_size or _env_int("MONGO_WRITE_BATCH_SIZE", 100)
+        self.flush_interval = flush_interval or _env_float("MONGO_WRITE_FLUSH_INTERVAL", 1.0)
+        self.max_pending = max_pending or _env_int("MONGO_WRITE_MAX_PENDING", 10000)
+        self.dropped = 0
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def write(self, document):
+        """Queue one document for insertion and return immediately."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"writer for {self.db_name}.{self.collection_name} is closed")
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append(document)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"mongo-writer-{self.collection_name}", daemon=True
+                )
+                self._thread.start()
+            # Wake the flusher when a batch is full, or to start the flush_interval
+            # clock when the buffer goes from empty to non-empty.
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def pending(self):
+        """Number of documents waiting to be written."""
+        return len(self._pending)
+
+    def flush(self):
+        """Synchronously write everything that is currently buffered."""
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return
+            if not self._insert(batch):
+                return
+
+    def close(self, timeout=5.0):
+        """Stop the flusher thread after it has drained the buffer."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _take_batch(self):
+        count = min(self.batch_size, len(self._pending))
+        return [self._pending.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = None
+                while not self._closed and len(self._pending) < self.batch_size:
+                    if not self._pending:
+                        deadline = None
+                        self._cond.wait()
+                        continue
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+                if not batch and self._closed:
+                    return
+            if batch and not self._insert(batch):
+                if self._closed:
+                    return
+                time.sleep(self.flush_interval)
+
+    def _insert(self, batch):
+        """Insert one batch; put it back at the head of the buffer on connection errors."""
+        try:
+            get_collection(self.db_name, self.collection_name).insert_many(batch, ordered=False)
+            return True
+        except BulkWriteError as e:
+            # Unordered inserts keep going past bad documents; nothing to retry.
+            logger.warning("Bulk insert into %s.%s partially failed: %s",
+                           self.db_name, self.collection_name, e.details.get("writeErrors"))
+            return True
+        except (BSONError, TypeError) as e:
+            # Not a PyMongoError: a document that cannot be encoded would fail on every retry.
+            logger.error("Dropping %d buffered document(s) for %s.%s that cannot be encoded: %s",
+                         len(batch), self.db_name, self.collection_name, e)
+            with self._cond:
+                self.dropped += len(batch)
+            return True
+        except PyMongoError as e:
+            logger.warning("Buffered insert into %s.%s failed, will retry: %s",
+                           self.db_name, self.collection_name, e)
+            with self._cond:
+                room = self.max_pending - len(self._pending)
+                self.dropped += max(0, len(batch) - room)
+                self._pending.extendleft(reversed(batch[:max(0, room)]))
+            return False
+
+
+def get_writer(db_name, collection_name):
+    """Return the process-wide BufferedWriter for a collection."""
+    key = (db_name, collection_name)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = BufferedWriter(db_name, collection_name)
+    return writer
+
+
+@atexit.register
+def _close_writers():
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.close()
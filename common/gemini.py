@@ -0,0 +1,58 @@
+"""
+Lazily imported Gemini client.
+
+``google.generativeai`` pulls in grpc and protobuf, which adds a noticeable
+delay to every app's cold start although no page needs the model before
+the user submits something. Apps call ``generative_model()`` at the point
+of use instead of importing and configuring the SDK at module top; the
+first call imports it and configures it with ``API_KEY`` from the
+environment.
+"""
+import os
+import threading
+
+from common.tracing import span
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    """Return the configured ``google.generativeai`` module, importing it on first use."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=os.getenv("API_KEY"))
+                _genai = genai
+    return _genai
+
+
+class TracedModel:
+    """A ``GenerativeModel`` whose ``generate_content`` calls are traced."""
+
+    def __init__(self, model, model_name):
+        self._model = model
+        self.model_name = model_name
+
+    def generate_content(self, *args, **kwargs):
+        with span("gemini.generate_content", "CLIENT") as current:
+            current.set("gen_ai.system", "gemini")
+            current.set("gen_ai.request.model", self.model_name)
+            response = self._model.generate_content(*args, **kwargs)
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                current.set("gen_ai.usage.input_tokens", usage.prompt_token_count)
+                current.set("gen_ai.usage.output_tokens", usage.candidates_token_count)
+            return response
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+def generative_model(model_name=DEFAULT_MODEL):
+    return TracedModel(get_genai().GenerativeModel(model_name), model_name)
@@ -0,0 +1,537 @@
+"""
+Offline multi-session load test for the Streamlit apps.
+
+Drives the real app scripts with Streamlit's ``AppTest`` - one instance per
+simulated student, all in this process the way one server process serves
+its sessions - with the external services replaced:
+
+* Gemini by ``StubGenai``, which sleeps ``--gemini-latency`` seconds
+  (plus up to ``--gemini-jitter``) per ``generate_content`` call and
+  returns canned answers in the shape each caller parses;
+* MongoDB by an in-memory ``mongomock`` client (``--mongo memory``, the
+  default) or the server at ``MONGO_URI`` (``--mongo uri``);
+* the webcam/microphone component of MockInter by a context that reports
+  a playing stream without video or audio processors.
+
+Flows (``--app``):
+
+* ``dsa``: enter a username and browse the question list, filter it, open
+  a question, run its test cases with a stand-in solution (code that looks
+  up each case's expected output; the editor is replaced by session state)
+  until it is submitted, go back to the recommendations. Needs
+  ``question_details.csv`` in ``CodingPract/`` (``--questions`` to point
+  elsewhere).
+* ``resume``: "upload" ``--resume PDF`` (made unique per user so the
+  analysis cache does not hide the work) and run the three analyses. Needs
+  pdf2image/poppler.
+* ``mockinter``: create an interview, answer every question, read the
+  summary (``--batch-scoring`` for one scoring request per interview).
+
+Each of ``--users`` sessions runs the flow ``--iterations`` times, started
+``--ramp-up`` seconds apart in total. The report has the flows and reruns
+per second, rerun latency percentiles (overall and per step), resident
+memory and threads added per session, how many script runs were in
+progress at once (sampled), the threads and script runs still alive once
+every flow has finished, and errors::
+
+    python -m common.loadtest --app dsa --users 20 --iterations 3
+    python -m common.loadtest --app mockinter --users 10 --gemini-latency 2 --json
+"""
+import argparse
+import io
+import json
+import os
+import random
+import re
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+APPS = {
+    "dsa": "CodingPract/DSA_app_db.py",
+    "resume": "ResumeATS/app.py",
+    "mockinter": "MockInter/app.py",
+}
+
+
+# ---------------------------
+# Service stand-ins
+# ---------------------------
+class _StubResponse:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class StubGenai:
+    """Drop-in for the configured ``google.generativeai`` module with a latency knob."""
+
+    def __init__(self, latency=1.0, jitter=0.3, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        stub = self
+
+        class GenerativeModel:
+            def __init__(self, model_name):
+                self.model_name = model_name
+
+            def generate_content(self, contents, **kwargs):
+                return stub.respond(contents, kwargs)
+
+        self.GenerativeModel = GenerativeModel
+        self.GenerationConfig = lambda **kwargs: kwargs
+
+    def configure(self, **kwargs):
+        pass
+
+    def respond(self, contents, kwargs):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+        time.sleep(delay)
+        prompt = " ".join(part for part in contents if isinstance(part, str))
+        if "Generate five interview questions" in prompt:
+            return _StubResponse("\n".join(f"{i}. Stub interview question number {i}?" for i in range(1, 6)))
+        if "Evaluate each of the candidate's answers" in prompt:
+            count = len(re.findall(r"^\s*\[\d+\]\s*$", prompt, re.MULTILINE))
+            rubric = {"correctness": 6, "depth": 5, "relevance": 7, "communication": 6}
+            answers = [{"index": i, "score": 6, "rubric": rubric, "feedback": "Stub feedback."} for i in range(count)]
+            return _StubResponse(json.dumps({"answers": answers}))
+        if "Technical Skills:[]" in prompt:
+            skills = {"Technical Skills": ["Python"], "Analytical Skills": ["SQL"], "Soft Skills": ["Teamwork"]}
+            return _StubResponse("```json\n" + json.dumps(skills) + "\n```")
+        if "Evaluate the following candidate's answer" in prompt:
+            return _StubResponse("Score: 6/10\nStub feedback on the answer.")
+        return _StubResponse("Match: 70%\nMissing keywords: none.\nStub final thoughts.")
+
+
+EDITOR_KEY = "loadtest_code"
+
+
+def _fake_editor(value="", **kwargs):
+    """``st_ace`` stand-in: returns the code the simulated user "typed" into session state."""
+    import streamlit as st
+
+    return st.session_state.get(EDITOR_KEY, value)
+
+
+class _FakeStreamState:
+    playing = True
+
+
+class _FakeStreamContext:
+    """What ``webrtc_streamer`` returns for a browser whose camera and microphone are on."""
+
+    def __init__(self):
+        self.state = _FakeStreamState()
+        self.video_transformer = None
+        self.audio_processor = None
+
+
+def install_stubs(gemini_latency, gemini_jitter, mongo):
+    """Swap in the Gemini stub, the MongoDB stand-in, the fake editor and media stream; returns the stub."""
+    from common import db, gemini
+
+    stub = StubGenai(gemini_latency, gemini_jitter)
+    gemini._genai = stub
+    if mongo == "memory":
+        import mongomock
+
+        db._client = mongomock.MongoClient()
+    try:
+        import streamlit_ace
+        streamlit_ace.st_ace = _fake_editor
+    except ImportError:
+        pass
+    try:
+        import streamlit_webrtc
+        streamlit_webrtc.webrtc_streamer = lambda *args, **kwargs: _FakeStreamContext()
+    except ImportError:
+        pass
+    return stub
+
+
+def serialize_script_compilation():
+    """Compile app scripts one at a time.
+
+    Every ``AppTest`` compiles the script on its own thread, and concurrent
+    ``ast.parse`` calls can fail on CPython 3.11 with "SystemError: AST
+    constructor recursion depth mismatch", which shows up as an empty page.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    lock = threading.Lock()
+    get_bytecode = ScriptCache.get_bytecode
+
+    def locked(self, script_path):
+        with lock:
+            return get_bytecode(self, script_path)
+
+    ScriptCache.get_bytecode = locked
+
+
+def share_test_runtime():
+    """Keep a test runtime available to every session's script run.
+
+    Each ``AppTest`` run installs its own stand-in ``Runtime`` singleton and
+    clears it when the run ends, so a session finishing its rerun breaks the
+    runs still in progress in the others ("Runtime hasn't been created!").
+    The stand-ins are interchangeable; fall back to the latest one.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test
+
+    latest = [None]
+    instance = Runtime.instance.__func__
+
+    class ScriptRunner(app_test.LocalScriptRunner):
+        def __init__(self, *args, **kwargs):
+            # Created by AppTest right after it installs its runtime.
+            latest[0] = Runtime._instance or latest[0]
+            super().__init__(*args, **kwargs)
+
+    def shared_instance(cls):
+        return cls._instance or latest[0] or instance(cls)
+
+    app_test.LocalScriptRunner = ScriptRunner
+    Runtime.instance = classmethod(shared_instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or latest[0] is not None)
+
+
+# ---------------------------
+# Measurement helpers
+# ---------------------------
+def rss_bytes():
+    """Current resident set size (Linux), else the peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class Session:
+    """One simulated student: an ``AppTest`` plus the timings of its reruns."""
+
+    def __init__(self, script, timeout, user):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(os.path.join(ROOT, script), default_timeout=timeout)
+        self.user = user
+        self.reruns = []  # (step, seconds)
+        self.errors = []
+
+    def run(self, step, element=None):
+        """Rerun the script (after interacting with ``element``) and time it."""
+        start = time.perf_counter()
+        try:
+            (element or self.app).run()
+        except Exception as e:
+            self.errors.append(f"{step}: {type(e).__name__}: {e}")
+            return False
+        self.reruns.append((step, time.perf_counter() - start))
+        for exception in self.app.exception:
+            self.errors.append(f"{step}: {exception.value}")
+        return not self.app.exception
+
+
+def _button(app, label=None, key=None):
+    for button in app.button:
+        if (key is not None and button.key == key) or (label is not None and button.label == label):
+            return button
+    return None
+
+
+# ---------------------------
+# Flows
+# ---------------------------
+def _call_key(*args, **kwargs):
+    return repr((args, sorted(kwargs.items())))
+
+
+def passing_solution(cases):
+    """Python code that prints the expected output of every ``(input, output)`` case, or None.
+
+    None when an input is not a Python call argument list (e.g. ``null``).
+    """
+    answers = {}
+    for case_input, case_output in cases:
+        try:
+            answers[eval(f"_call_key({case_input})", {"_call_key": _call_key})] = case_output
+        except Exception:
+            return None
+    return ("ANSWERS = " + repr(answers) + "\n\n"
+            "def function_name(*args, **kwargs):\n"
+            "    return ANSWERS[repr((args, sorted(kwargs.items())))]\n")
+
+
+def dsa_flow(session, rng, options):
+    app = session.app
+    if not session.run("open"):
+        return
+    app.query_params.clear()
+    app.session_state[EDITOR_KEY] = None
+    app.text_input[0].input(session.user)
+    if not session.run("list"):
+        return
+    difficulty = app.selectbox[0]
+    choices = [option for option in difficulty.options if option]
+    if choices:
+        difficulty.set_value(rng.choice(choices))
+        if not session.run("filter"):
+            return
+        difficulty.set_value("")
+        session.run("unfilter")
+    qids = [int(match.group(1)) for text in app.markdown
+            for match in [re.search(r"\(QID (\d+)\)", text.value)] if match]
+    if not qids:
+        session.errors.append("list: no questions")
+        return
+    # Open questions until one has test cases a stand-in solution can pass, then submit it.
+    for qid in rng.sample(qids, min(len(qids), options.max_questions)):
+        app.query_params["qid"] = str(qid)
+        if not session.run("question"):
+            return
+        inputs = [text.value[len("*Input:* "):] for text in app.markdown if text.value.startswith("*Input:* ")]
+        outputs = [text.value[len("*Output:* "):] for text in app.markdown if text.value.startswith("*Output:* ")]
+        solution = passing_solution(list(zip(inputs, outputs))) if inputs else None
+        if solution is not None:
+            break
+    else:
+        session.errors.append("question: no question with usable test cases")
+        return
+    app.session_state[EDITOR_KEY] = solution
+    for index in range(len(inputs)):
+        button = _button(app, key=f"case_{index}")
+        if button is None:
+            session.errors.append(f"run_case: no button for case {index + 1}")
+            return
+        if button.disabled:
+            continue
+        button.click()
+        if not session.run("run_case" if index < len(inputs) - 1 else "submit"):
+            return
+    if not any(text.value.startswith("All test cases passed") for text in app.success):
+        session.errors.append(f"submit: QID {qid} was not submitted")
+        return
+    app.session_state[EDITOR_KEY] = None
+    app.query_params.clear()
+    # The question list recomputes the user's recommendations after the submission.
+    session.run("back")
+
+
+class _UploadedPdf(io.BytesIO):
+    name = "resume.pdf"
+    type = "application/pdf"
+
+
+def resume_flow(session, rng, options):
+    app = session.app
+    if not session.run("open"):
+        return
+    # AppTest cannot drive file_uploader; the app keeps the upload in session_state.
+    app.session_state["resume"] = _UploadedPdf(options.resume_bytes + f"\n% {session.user} {rng.random()}\n".encode())
+    app.text_area(key="input").input("Python developer with SQL and cloud experience.")
+    if not session.run("job_description"):
+        return
+    for label in ("Tell Me About the Resume", "Get Keywords", "Percentage match"):
+        app.session_state["resume"].seek(0)
+        _button(app, label).click()
+        if not session.run(label.lower().replace(" ", "_")):
+            return
+
+
+def mockinter_flow(session, rng, options):
+    app = session.app
+    if not session.run("open"):
+        return
+    _button(app, "+ Add New").click()
+    if not session.run("new_interview"):
+        return
+    app.text_input[0].input(session.user)
+    app.text_input[1].input(rng.choice(["Full Stack Developer", "Backend Developer", "Data Scientist"]))
+    app.text_input[2].input(rng.choice(["React, Node.js", "Python, Django", "Python, Machine Learning"]))
+    app.number_input[0].set_value(rng.randint(0, 8))
+    for checkbox in app.checkbox:
+        if checkbox.label == "Score all answers at the end":
+            checkbox.set_value(options.batch_scoring)
+    _button(app, "Start Interview").click()
+    if not session.run("start_interview"):
+        return
+    index = 0
+    while _button(app, key=f"next_{index}") is not None:
+        app.text_area(key=f"answer_{index}").input(f"My answer to question {index + 1}, with some detail.")
+        _button(app, key=f"next_{index}").click()
+        if not session.run("next_question"):
+            return
+        index += 1
+    if index == 0:
+        session.errors.append("start_interview: no questions shown")
+        return
+    close = _button(app, "Close Interview")
+    if close is None:
+        session.errors.append("summary: no Close Interview button")
+        return
+    close.click()
+    session.run("close")
+
+
+FLOWS = {"dsa": dsa_flow, "resume": resume_flow, "mockinter": mockinter_flow}
+
+
+# ---------------------------
+# Driver
+# ---------------------------
+def run_load(options):
+    stub = install_stubs(options.gemini_latency, options.gemini_jitter, options.mongo)
+    serialize_script_compilation()
+    share_test_runtime()
+    script = APPS[options.app]
+    app_dir = os.path.join(ROOT, os.path.dirname(script))
+    sys.path.insert(0, app_dir)
+    if options.app == "dsa":
+        # The app reads question_details.csv relative to the working directory.
+        os.chdir(os.path.dirname(os.path.abspath(options.questions)) if options.questions else app_dir)
+    flow = FLOWS[options.app]
+
+    base_rss, base_threads = rss_bytes(), threading.active_count()
+    sessions = [Session(script, options.timeout, f"loadtest-{i}") for i in range(options.users)]
+    flows_done = [0]
+    lock = threading.Lock()
+
+    def user(i):
+        rng = random.Random(options.seed + i)
+        time.sleep(options.ramp_up * i / max(1, options.users))
+        for _ in range(options.iterations):
+            errors = len(sessions[i].errors)
+            try:
+                flow(sessions[i], rng, options)
+            except Exception as e:
+                # An element the flow expected is missing, e.g. after a timed-out rerun.
+                sessions[i].errors.append(f"flow: {type(e).__name__}: {e}")
+            if len(sessions[i].errors) == errors:
+                with lock:
+                    flows_done[0] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), name=f"loadtest-user-{i}") for i in range(options.users)]
+    for thread in threads:
+        thread.start()
+    peak_rss, peak_threads = rss_bytes(), threading.active_count()
+    script_samples = []
+    while any(thread.is_alive() for thread in threads):
+        time.sleep(0.2)
+        peak_rss, peak_threads = max(peak_rss, rss_bytes()), max(peak_threads, threading.active_count())
+        script_samples.append(sum(thread.name == "ScriptRunner.scriptThread" for thread in threading.enumerate()))
+    wall = time.perf_counter() - started
+    # Script threads that outlive their session's flow (a script run that never finishes).
+    time.sleep(1.0)
+    left_threads = threading.active_count() - base_threads
+    running_scripts = sum(thread.name == "ScriptRunner.scriptThread" for thread in threading.enumerate())
+
+    reruns = [seconds for s in sessions for _, seconds in s.reruns]
+    per_step = defaultdict(list)
+    for s in sessions:
+        for step, seconds in s.reruns:
+            per_step[step].append(seconds)
+    errors = [f"{s.user} {error}" for s in sessions for error in s.errors]
+    return {
+        "app": options.app,
+        "users": options.users,
+        "wall_s": wall,
+        "flows_completed": flows_done[0],
+        "flows_per_s": flows_done[0] / wall if wall else 0.0,
+        "reruns": len(reruns),
+        "reruns_per_s": len(reruns) / wall if wall else 0.0,
+        "rerun_ms": {f"p{q}": percentile(reruns, q) * 1000 for q in (50, 95, 99)},
+        "step_ms": {step: {"count": len(v), "p50": percentile(v, 50) * 1000, "p95": percentile(v, 95) * 1000}
+                    for step, v in per_step.items()},
+        "gemini_calls": stub.calls,
+        "rss_mb": {"base": base_rss / 2**20, "peak": peak_rss / 2**20},
+        "rss_mb_per_session": (peak_rss - base_rss) / 2**20 / max(1, options.users),
+        "threads": {"base": base_threads, "peak": peak_threads,
+                    "per_session": (peak_threads - base_threads - options.users) / max(1, options.users),
+                    "left_after_flows": left_threads, "script_runs_still_running": running_scripts,
+                    "script_runs_mean": sum(script_samples) / max(1, len(script_samples)),
+                    "script_runs_peak": max(script_samples, default=0)},
+        "errors": len(errors),
+        "error_samples": errors[:10],
+    }
+
+
+def print_report(report):
+    print(f"{report['app']}: {report['users']} users, {report['wall_s']:.1f} s, "
+          f"{report['flows_completed']} flows ({report['flows_per_s']:.2f}/s), "
+          f"{report['reruns']} reruns ({report['reruns_per_s']:.1f}/s)")
+    rerun = report["rerun_ms"]
+    print(f"rerun latency ms  p50 {rerun['p50']:.0f}  p95 {rerun['p95']:.0f}  p99 {rerun['p99']:.0f}")
+    for step, stats in report["step_ms"].items():
+        print(f"  {step:<28} n={stats['count']:<5} p50 {stats['p50']:8.0f} ms  p95 {stats['p95']:8.0f} ms")
+    print(f"gemini calls: {report['gemini_calls']}")
+    rss = report["rss_mb"]
+    print(f"memory: {rss['base']:.0f} MB -> {rss['peak']:.0f} MB peak, "
+          f"{report['rss_mb_per_session']:.1f} MB per session")
+    threads = report["threads"]
+    print(f"threads: {threads['base']} -> {threads['peak']} peak, "
+          f"{threads['per_session']:.1f} extra per session (besides the simulated user), "
+          f"{threads['left_after_flows']} left after the flows, "
+          f"{threads['script_runs_still_running']} script runs still running")
+    print(f"script runs in progress: mean {threads['script_runs_mean']:.1f}, peak {threads['script_runs_peak']}")
+    print(f"errors: {report['errors']}")
+    for error in report["error_samples"]:
+        print(f"  {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test a Streamlit app with simulated concurrent users.")
+    parser.add_argument("--app", choices=sorted(APPS), required=True)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=1, help="flows per user")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds over which users start")
+    parser.add_argument("--timeout", type=float, default=60.0, help="max seconds per rerun")
+    parser.add_argument("--gemini-latency", type=float, default=1.0)
+    parser.add_argument("--gemini-jitter", type=float, default=0.3)
+    parser.add_argument("--mongo", choices=("memory", "uri"), default="memory")
+    parser.add_argument("--questions", help="question_details.csv for the dsa app")
+    parser.add_argument("--max-questions", type=int, default=5,
+                        help="dsa: questions opened to find one whose test cases can be passed")
+    parser.add_argument("--resume", help="PDF uploaded in the resume flow")
+    parser.add_argument("--batch-scoring", action="store_true", help="mockinter: score once per interview")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    options = parser.parse_args(argv)
+    if options.app == "resume":
+        if not options.resume:
+            parser.error("--resume PDF is required for the resume flow")
+        with open(options.resume, "rb") as f:
+            options.resume_bytes = f.read()
+
+    report = run_load(options)
+    if options.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Cold-start benchmark for the Streamlit apps.
+
+Each app is started in a fresh interpreter under ``python -X importtime``
+and rendered once with Streamlit's ``AppTest`` (no browser, no server). For
+every app the report has:
+
+* ``first_render_s`` - interpreter start to the end of the first script run,
+* ``import_s`` - total time spent importing modules,
+* ``heaviest`` - the top-level packages with the largest cumulative import
+  time, which is where deferring an import pays off.
+
+Run from the repository root::
+
+    python -m common.startup_bench                 # report
+    python -m common.startup_bench --update        # store the baseline
+    python -m common.startup_bench --check         # exit 1 on a regression
+
+The baseline (``startup_baseline.json`` next to this file) is machine
+specific: record it on the same kind of host that runs ``--check``, which
+fails while no baseline exists. A run regresses when ``first_render_s``
+exceeds the baseline by more than ``--tolerance`` (default 20 %) plus
+``--slack`` seconds (default 0.25).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = {
+    "mockinter": "MockInter/app.py",
+    "mockinter_emotion": "MockInter/app1.py",
+    "dsa_practice": "CodingPract/DSA_app_db.py",
+    "dsa_dashboard": "CodingPract/DSA_dash.py",
+    "resume_ats": "ResumeATS/app.py",
+}
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+# Runs inside the measured interpreter; prints one JSON line.
+_RENDER = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[2]))
+app.run()
+print(json.dumps({"render_s": time.perf_counter() - start,
+                  "exceptions": [str(e.value) for e in app.exception]}))
+"""
+
+
+def parse_importtime(stderr):
+    """Total import seconds and cumulative seconds per top-level package from ``-X importtime`` output."""
+    packages = defaultdict(float)
+    total = 0.0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        total += int(self_us) / 1e6
+        # Only un-indented entries are imported directly (not by another module).
+        if not name.startswith("   "):
+            packages[name.strip().split(".")[0]] += int(cumulative_us) / 1e6
+    return total, dict(packages)
+
+
+def measure(script, timeout=60.0):
+    """Start ``script`` in a fresh interpreter and return its cold-start numbers."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _RENDER, os.path.join(ROOT, script), str(timeout)],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.join(ROOT, script)),
+        timeout=timeout + 30,
+    )
+    wall = time.perf_counter() - started
+    import_s, packages = parse_importtime(result.stderr)
+    rendered = None
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith("{"):
+            rendered = json.loads(line)
+            break
+    if rendered is None:
+        tail = [line for line in result.stderr.splitlines() if not line.startswith("import time:")][-5:]
+        return {"error": "\n".join(tail) or f"exit status {result.returncode}", "wall_s": wall}
+    return {
+        "first_render_s": wall,
+        "import_s": import_s,
+        "heaviest": dict(sorted(packages.items(), key=lambda item: -item[1])[:10]),
+        "exceptions": rendered["exceptions"],
+    }
+
+
+def check(results, baseline, tolerance, slack):
+    """Apps that failed to render or whose first render got slower than the baseline allows."""
+    regressions = []
+    for name, result in results.items():
+        if "error" in result:
+            regressions.append(f"{name}: failed to render")
+        elif name in baseline:
+            limit = baseline[name]["first_render_s"] * (1 + tolerance) + slack
+            if result["first_render_s"] > limit:
+                regressions.append(f"{name}: {result['first_render_s']:.2f}s > {limit:.2f}s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cold start of every Streamlit app.")
+    parser.add_argument("apps", nargs="*", help=f"apps to measure: {', '.join(sorted(APPS))} (default: all)")
+    parser.add_argument("--runs", type=int, default=3, help="cold starts per app; the median is reported")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="compare against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--slack", type=float, default=0.25)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    unknown = set(args.apps) - set(APPS)
+    if unknown:
+        parser.error(f"unknown apps: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in args.apps or sorted(APPS):
+        runs = [measure(APPS[name], args.timeout) for _ in range(args.runs)]
+        ok = sorted((run for run in runs if "error" not in run), key=lambda run: run["first_render_s"])
+        results[name] = ok[len(ok) // 2] if ok else runs[-1]
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        for name, result in results.items():
+            if "error" in result:
+                print(f"{name:<18} failed: {result['error']}")
+                continue
+            print(f"{name:<18} first render {result['first_render_s']:.2f}s  imports {result['import_s']:.2f}s")
+            for package, seconds in result["heaviest"].items():
+                print(f"    {package:<28} {seconds * 1000:8.1f} ms")
+            for exception in result["exceptions"]:
+                print(f"    exception: {exception}")
+
+    if args.update:
+        baseline = {}
+        if os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update({name: {"first_render_s": r["first_render_s"], "import_s": r["import_s"]}
+                         for name, r in results.items() if "error" not in r})
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.check:
+        if not os.path.exists(BASELINE_PATH):
+            # A check without a baseline would always pass; fail until one is recorded.
+            print(f"No baseline at {BASELINE_PATH}; run with --update on this host first.")
+            return 1
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            regressions = check(results, json.load(f), args.tolerance, args.slack)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""
+Lightweight tracing for the Streamlit apps.
+
+Spans follow the OpenTelemetry data model (trace and span ids, parent,
+start/end in Unix nanoseconds, attributes, status) and are exported as
+OTLP/JSON - one ``ExportTraceServiceRequest`` object per line - to a local
+file, the format the OpenTelemetry Collector's ``otlpjsonfile`` receiver
+reads. Nothing here needs the OpenTelemetry SDK.
+
+What is traced:
+
+* ``span(name, **attributes)`` / ``@traced(name)`` around any block, e.g.
+  ``input_pdf_setup``;
+* every Gemini ``generate_content`` call (``common.gemini`` wraps models);
+* every MongoDB command, through pymongo command monitoring
+  (``command_listener`` is registered by ``common.db.get_client``);
+* ``traced_run``, a drop-in for ``subprocess.run``.
+
+``begin_rerun(app)`` at the top of a Streamlit script starts a new trace for
+that script run and stamps every span in it with ``session.id`` and
+``streamlit.rerun`` (the rerun number within the session).
+
+Configuration: tracing is off unless ``TRACING=1``; ``TRACE_PATH`` sets the
+file (default ``<tempdir>/techmanjari-traces.jsonl``) and
+``TRACE_MAX_BYTES`` its size limit (50 MB): a full file is renamed to
+``<TRACE_PATH>.1``, replacing the previous one, and a new file is started.
+To see where time goes::
+
+    python -m common.tracing                      # slowest spans, p95 per operation
+    python -m common.tracing traces.jsonl --top 20 --name mongodb.find
+"""
+import argparse
+import atexit
+import contextvars
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+TRACING_ENABLED = os.getenv("TRACING", "0") == "1"
+TRACE_PATH = os.getenv("TRACE_PATH", os.path.join(tempfile.gettempdir(), "techmanjari-traces.jsonl"))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(50 * 2**20)))
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "techmanjari")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_rerun = contextvars.ContextVar("rerun", default=None)
+
+
+def _new_id(nbytes):
+    return os.urandom(nbytes).hex()
+
+
+class Span:
+    """One timed operation."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "start_ns", "end_ns", "attributes",
+                 "status", "message")
+
+    def __init__(self, name, kind="INTERNAL", attributes=None, parent=None, start_ns=None):
+        rerun = _rerun.get()
+        parent = parent if parent is not None else _current_span.get()
+        self.name = name
+        self.kind = kind
+        if parent is not None:
+            self.trace_id, self.parent_id = parent.trace_id, parent.span_id
+        else:
+            self.trace_id = rerun["trace_id"] if rerun else _new_id(16)
+            self.parent_id = None
+        self.span_id = _new_id(8)
+        self.attributes = dict(rerun["attributes"]) if rerun else {}
+        if attributes:
+            self.attributes.update(attributes)
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.status = "UNSET"
+        self.message = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def fail(self, error):
+        self.status = "ERROR"
+        self.message = f"{type(error).__name__}: {error}"
+
+    def end(self, end_ns=None):
+        self.end_ns = end_ns or time.time_ns()
+        if self.status == "UNSET":
+            self.status = "OK"
+        _exporter.export(self)
+
+
+@contextmanager
+def span(name, kind="INTERNAL", **attributes):
+    """Time the enclosed block as a child of the current span."""
+    current = Span(name, kind, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        # Streamlit's rerun/stop signals derive from BaseException and are not failures.
+        current.fail(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def traced(name=None, **attributes):
+    """Decorator form of ``span``; the span is named after the function by default."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name or fn.__qualname__, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def begin_rerun(app):
+    """Start the trace for the current Streamlit script run of ``app``."""
+    global SERVICE_NAME
+    import streamlit as st
+
+    SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", app)
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        session_id = ctx.session_id if ctx is not None else None
+    except ImportError:
+        session_id = None
+    st.session_state["_trace_rerun"] = st.session_state.get("_trace_rerun", 0) + 1
+    _rerun.set({
+        "trace_id": _new_id(16),
+        "attributes": {"app": app, "session.id": session_id, "streamlit.rerun": st.session_state["_trace_rerun"]},
+    })
+
+
+def traced_run(args, **kwargs):
+    """``subprocess.run`` in a ``subprocess.run`` span (command, exit code, timeout)."""
+    with span("subprocess.run") as current:
+        current.set("process.command", os.path.basename(str(args[0])))
+        current.set("process.command_line", " ".join(map(str, args)))
+        try:
+            result = subprocess.run(args, **kwargs)
+        except subprocess.TimeoutExpired:
+            current.set("process.timed_out", True)
+            raise
+        current.set("process.exit_code", result.returncode)
+        if result.returncode != 0:
+            current.status = "ERROR"
+        return result
+
+
+# ---------------------------
+# MongoDB command monitoring
+# ---------------------------
+# Authentication and topology chatter, not application queries.
+_IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "getnonce",
+                     "authenticate", "buildinfo", "buildInfo", "endSessions"}
+
+try:
+    from pymongo import monitoring
+
+    class MongoCommandListener(monitoring.CommandListener):
+        """Emit one client span per MongoDB command; pymongo calls these on the issuing thread."""
+
+        def __init__(self):
+            self._started = {}
+            self._lock = threading.Lock()
+
+        def started(self, event):
+            if event.command_name in _IGNORED_COMMANDS:
+                return
+            collection = event.command.get(event.command_name)
+            current = Span(f"mongodb.{event.command_name}", "CLIENT", {
+                "db.system": "mongodb",
+                "db.name": event.database_name,
+                "db.operation": event.command_name,
+                "db.mongodb.collection": collection if isinstance(collection, str) else None,
+                "server.address": "%s:%s" % event.connection_id,
+            })
+            with self._lock:
+                self._started[(event.request_id, event.connection_id)] = current
+
+        def succeeded(self, event):
+            self._finish(event)
+
+        def failed(self, event):
+            current = self._finish(event, export=False)
+            if current is not None:
+                current.status = "ERROR"
+                current.message = str(event.failure.get("errmsg", event.failure))
+                current.end(current.start_ns + event.duration_micros * 1000)
+
+        def _finish(self, event, export=True):
+            with self._lock:
+                current = self._started.pop((event.request_id, event.connection_id), None)
+            if current is not None and export:
+                current.end(current.start_ns + event.duration_micros * 1000)
+            return current
+
+except ImportError:  # pymongo is only needed by the apps that use MongoDB
+    MongoCommandListener = None
+
+
+def command_listener():
+    """Listener for ``MongoClient(event_listeners=[...])``, or None when tracing is off."""
+    return MongoCommandListener() if TRACING_ENABLED and MongoCommandListener is not None else None
+
+
+# ---------------------------
+# OTLP/JSON file exporter
+# ---------------------------
+def _attribute(key, value):
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _span_json(s):
+    record = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": f"SPAN_KIND_{s.kind}",
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [_attribute(k, v) for k, v in s.attributes.items() if v is not None],
+        "status": {"code": f"STATUS_CODE_{s.status}"},
+    }
+    if s.parent_id:
+        record["parentSpanId"] = s.parent_id
+    if s.message:
+        record["status"]["message"] = s.message
+    return record
+
+
+class FileExporter:
+    """Buffer finished spans and append them to ``path`` from a background thread."""
+
+    def __init__(self, path=TRACE_PATH, flush_interval=1.0, max_pending=10000, max_bytes=TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._pending = deque(maxlen=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def export(self, s):
+        if not TRACING_ENABLED:
+            return
+        self._pending.append(s)
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def flush(self):
+        spans = []
+        while self._pending:
+            spans.append(self._pending.popleft())
+        if not spans:
+            return
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", SERVICE_NAME),
+                                        _attribute("process.pid", os.getpid())]},
+            "scopeSpans": [{"scope": {"name": "common.tracing"}, "spans": [_span_json(s) for s in spans]}],
+        }]}
+        line = json.dumps(request, separators=(",", ":")) + "\n"
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+            except OSError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+
+_exporter = FileExporter()
+atexit.register(_exporter.flush)
+
+
+# ---------------------------
+# Summary command line
+# ---------------------------
+def read_spans(paths):
+    """Yield ``(service, span)`` for every span in OTLP/JSON files."""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                for resource_spans in json.loads(line).get("resourceSpans", []):
+                    attributes = {a["key"]: next(iter(a["value"].values()))
+                                  for a in resource_spans.get("resource", {}).get("attributes", [])}
+                    for scope_spans in resource_spans.get("scopeSpans", []):
+                        for s in scope_spans.get("spans", []):
+                            yield attributes.get("service.name"), s
+
+
+def _percentile(values, q):
+    # Linear interpolation between closest ranks (numpy's default).
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(paths, top=10, name=None):
+    """Per-operation count/p50/p95/max and the ``top`` slowest spans (durations in ms)."""
+    durations = defaultdict(list)
+    slowest = []
+    for service, s in read_spans(paths):
+        if name and s["name"] != name:
+            continue
+        ms = (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e6
+        durations[s["name"]].append(ms)
+        attributes = {a["key"]: next(iter(a["value"].values())) for a in s.get("attributes", [])}
+        slowest.append((ms, service, s["name"], attributes, s.get("status", {}).get("code")))
+    operations = {
+        op: {"count": len(v), "p50": _percentile(v, 50), "p95": _percentile(v, 95),
+             "max": max(v), "total": sum(v)}
+        for op, v in durations.items()
+    }
+    slowest.sort(key=lambda item: -item[0])
+    return operations, slowest[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize trace files written by common.tracing.")
+    parser.add_argument("paths", nargs="*",
+                        default=[path for path in (TRACE_PATH + ".1", TRACE_PATH) if os.path.exists(path)])
+    parser.add_argument("--top", type=int, default=10, help="number of slowest spans to list")
+    parser.add_argument("--name", help="only spans with this name")
+    args = parser.parse_args(argv)
+
+    operations, slowest = summarize(args.paths, args.top, args.name)
+    print(f"{'operation':<36} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'total s':>9}")
+    for op, stats in sorted(operations.items(), key=lambda item: -item[1]["total"]):
+        print(f"{op:<36} {stats['count']:>7} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['max']:>9.1f} "
+              f"{stats['total'] / 1000:>9.2f}")
+    print(f"\nslowest {len(slowest)} spans:")
+    for ms, service, op, attributes, status in slowest:
+        where = f"session {attributes.get('session.id', '-')} rerun {attributes.get('streamlit.rerun', '-')}"
+        detail = attributes.get("db.mongodb.collection") or attributes.get("process.command_line") \
+            or attributes.get("gen_ai.request.model") or ""
+        print(f"{ms:>10.1f} ms  {service or '-':<14} {op:<28} {where}  {detail}"
+              f"{'  ' + status if status == 'STATUS_CODE_ERROR' else ''}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+
+import mongomock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import db
+
+
+def test_buffered_writer_flushes_each_write_after_flush_interval(monkeypatch):
+    monkeypatch.setattr(db, "_client", mongomock.MongoClient())
+    writer = db.BufferedWriter("test_db", "docs", batch_size=100, flush_interval=0.2)
+    try:
+        writer.write({"n": 1})
+        time.sleep(0.5)
+        assert db.get_collection("test_db", "docs").count_documents({}) == 1
+
+        # The flusher is idle now; a single new document must still go out after flush_interval.
+        writer.write({"n": 2})
+        time.sleep(0.5)
+        assert writer.pending() == 0
+        assert sorted(d["n"] for d in db.get_collection("test_db", "docs").find()) == [1, 2]
+    finally:
+        writer.close()
+
+
+def test_buffered_writer_drops_unencodable_batch_and_keeps_flushing(monkeypatch):
+    monkeypatch.setattr(db, "_client", mongomock.MongoClient())
+    writer = db.BufferedWriter("test_db", "docs", batch_size=1, flush_interval=0.1)
+    try:
+        writer.write({"n": object()})
+        time.sleep(0.3)
+        writer.write({"n": 2})
+        time.sleep(0.3)
+        assert writer.dropped == 1
+        assert writer.pending() == 0
+        assert [d["n"] for d in db.get_collection("test_db", "docs").find()] == [2]
+    finally:
+        writer.close()
@@ -0,0 +1,38 @@
+import os
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "MockInter"))
+from evaluation import DONE, PENDING, AnswerEvaluator
+
+
+class _Writer:
+    def write(self, record):
+        pass
+
+    def flush(self):
+        pass
+
+
+def test_finished_evaluations_beyond_max_tracked_are_dropped():
+    release = threading.Event()
+
+    def evaluate(question, answer):
+        if answer == "slow":
+            release.wait(5)
+        return "feedback"
+
+    evaluator = AnswerEvaluator(evaluate, _Writer(), max_workers=2, max_tracked=5)
+    try:
+        evaluator.submit("slow", "q", "slow", {})
+        for i in range(20):
+            evaluator.submit(f"k{i}", "q", "a", {}).result(timeout=5)
+        # The pending evaluation survives eviction; the oldest finished ones do not.
+        assert evaluator.status("slow") == PENDING
+        assert len(evaluator._futures) == 5
+        assert evaluator.status("k0") is None
+        assert evaluator.status("k19") == DONE
+    finally:
+        release.set()
+        evaluator._executor.shutdown(wait=True)
@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+import mongomock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "MockInter"))
+from common import db
+from proctor_log import ViolationLogger
+
+
+def _spilled(student_id):
+    return json.dumps({"_id": "65f000000000000000000%03d" % student_id, "student_id": f"s{student_id}",
+                       "violation": "No Face Detected!", "timestamp": "2024-01-01T10:00:00",
+                       "end": "2024-01-01T10:00:05", "count": 3}) + "\n"
+
+
+def test_replay_skips_truncated_lines_and_recovers_leftover_replays(monkeypatch, tmp_path):
+    monkeypatch.setattr(db, "_client", mongomock.MongoClient())
+    spill_path = str(tmp_path / "face_logs.jsonl")
+    with open(spill_path, "w", encoding="utf-8") as f:
+        f.write(_spilled(1) + _spilled(2)[:40])  # the second line was cut short by a crash
+    # Left behind by a process that was killed while replaying.
+    with open(spill_path + ".99999.replay", "w", encoding="utf-8") as f:
+        f.write(_spilled(3))
+
+    logger = ViolationLogger("test_db", spill_path=spill_path, flush_interval=0.05)
+    logger.log("s4", "Multiple Faces Detected!", timestamp=1.0)
+    logger.close()
+
+    assert not logger._thread.is_alive()
+    stored = sorted(doc["student_id"] for doc in db.get_collection("test_db", "face_logs").find())
+    assert stored == ["s1", "s3", "s4"]
+    assert os.listdir(tmp_path) == []
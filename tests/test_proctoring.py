@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "MockInter"))
+import proctoring
+from detection import DetectionScheduler
+
+FACE = (200, 120, 160, 160)
+
+
+class _Frame:
+    pts = None
+
+    def to_ndarray(self, format):
+        return np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def _transformer(monkeypatch, detections):
+    """A thread-backend transformer at the maximum detection interval, fed ``detections`` in order."""
+    logged = []
+    monkeypatch.setattr(proctoring, "store_face_log", lambda student_id, message: logged.append(message))
+    now = [0.0]
+
+    def clock():
+        now[0] += 0.1
+        return now[0]
+
+    transformer = proctoring.VideoTransformer(backend="thread", clock=clock)
+    # smoothing=0 keeps the first (expensive) cost, so the interval stays at its maximum.
+    transformer.scheduler = DetectionScheduler(frame_budget=0.008, max_interval=6, smoothing=0)
+    transformer.scheduler.record(0.045)
+    assert transformer.scheduler.interval == 6
+
+    def detect(gray):
+        transformer.faces, transformer.eyes, transformer.eye_violation = list(detections.pop(0)), [], False
+        transformer._fresh_result = True
+
+    transformer.detect = detect
+    transformer.proctoring_enabled = True
+    transformer.student_id = "student"
+    return transformer, logged
+
+
+def _run(transformer, frames):
+    try:
+        for _ in range(frames):
+            transformer.transform(_Frame())
+    finally:
+        transformer.on_ended()
+
+
+def test_single_missed_detection_at_max_interval_is_not_a_violation(monkeypatch):
+    detections = [[FACE]] * 5 + [[]] + [[FACE]] * 4 + [[FACE, FACE]] + [[FACE]] * 4
+    transformer, logged = _transformer(monkeypatch, detections)
+    _run(transformer, 6 * 15)
+    assert logged == []
+    assert transformer.no_face_warning_count == 0
+    assert transformer.multiple_face_warning_count == 0
+
+
+def test_consecutive_missed_detections_are_a_violation(monkeypatch):
+    detections = [[FACE]] * 5 + [[]] * 5 + [[FACE]] * 2
+    transformer, logged = _transformer(monkeypatch, detections)
+    _run(transformer, 6 * 12)
+    assert logged == ["No Face Detected!"]
+    assert transformer.no_face_warning_count == 1